@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+MemberHandler = Callable[[discord.Member], Awaitable[None]]
+
+class _PendingEvent:
+    __slots__ = ('kind', 'member', 'enqueued_at')
+
+    def __init__(self, kind: str, member: discord.Member, enqueued_at: float):
+        self.kind = kind
+        self.member = member
+        self.enqueued_at = enqueued_at
+
+class AdmissionQueue:
+    """Bounded queue between member join/leave events and the onboarding work.
+
+    Each user has at most one pending event: a later join or leave from the same
+    user replaces the pending one and keeps its place in line, so join/leave/join
+    bursts collapse into a single onboarding. A user's events never run
+    concurrently; one that arrives while the user is being handled waits for
+    that to finish. New users are dropped once maxsize users are waiting.
+    """
+
+    def __init__(self, on_join: MemberHandler, on_leave: MemberHandler,
+                 workers: int = 4, maxsize: int = 1000):
+        self.on_join = on_join
+        self.on_leave = on_leave
+        self.workers = workers
+        self.maxsize = maxsize
+        self._queue: Optional[asyncio.Queue] = None
+        self._pending: Dict[int, _PendingEvent] = {}
+        self._running: Set[int] = set()
+        self._tasks: List[asyncio.Task] = []
+        self.processed = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.failed = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def start(self):
+        """Start the workers on the running event loop"""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Stop the workers; events still waiting are discarded"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit_join(self, member: discord.Member) -> bool:
+        """Queue onboarding for a member who joined. Returns False if dropped."""
+        return self._submit('join', member)
+
+    def submit_leave(self, member: discord.Member) -> bool:
+        """Queue clean-up for a member who left. Returns False if dropped."""
+        return self._submit('leave', member)
+
+    def queue_length(self) -> int:
+        """Number of users waiting to be handled"""
+        return len(self._pending)
+
+    def get_stats(self) -> Dict:
+        """Get backpressure metrics"""
+        return {
+            'queued': len(self._pending),
+            'running': len(self._running),
+            'maxsize': self.maxsize,
+            'processed': self.processed,
+            'failed': self.failed,
+            'dropped': self.dropped,
+            'coalesced': self.coalesced,
+            'average_wait_ms': self._total_wait / self.processed * 1000 if self.processed else 0.0,
+            'max_wait_ms': self._max_wait * 1000
+        }
+
+    def _submit(self, kind: str, member: discord.Member) -> bool:
+        pending = self._pending.get(member.id)
+        if pending is not None:
+            pending.kind = kind
+            pending.member = member
+            self.coalesced += 1
+            return True
+
+        if len(self._pending) >= self.maxsize:
+            self.dropped += 1
+            logger.warning(f"Onboarding queue full ({self.maxsize}), dropped {kind} of {member}")
+            return False
+
+        self._pending[member.id] = _PendingEvent(kind, member, time.monotonic())
+        # A user already being handled is queued again once that finishes
+        if member.id not in self._running:
+            self._queue.put_nowait(member.id)
+        return True
+
+    async def _worker(self):
+        while True:
+            user_id = await self._queue.get()
+            event = self._pending.pop(user_id, None)
+            if event is None:
+                continue
+
+            wait = time.monotonic() - event.enqueued_at
+            self._total_wait += wait
+            self._max_wait = max(self._max_wait, wait)
+            self._running.add(user_id)
+            try:
+                handler = self.on_join if event.kind == 'join' else self.on_leave
+                await handler(event.member)
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Failed to handle {event.kind} of {event.member}: {e}")
+            finally:
+                self.processed += 1
+                self._running.discard(user_id)
+                if user_id in self._pending:
+                    self._queue.put_nowait(user_id)
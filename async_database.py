@@ -0,0 +1,426 @@
+import asyncio
+import copy
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.request import pathname2url
+from typing import Dict, List, Optional, Any, Callable, Iterator, Set, Tuple
+
+from cache import LRUCache, MISSING
+from database import DatabaseManager, enable_incremental_vacuum
+from export_data import export_to_path
+from storage import InMemoryStorage, StorageBackend
+
+# What each write method returns when it fails, per the StorageBackend contract.
+# Used when a job's batch cannot be committed, so callers see a failure value
+# instead of an exception.
+WRITE_FAILURE_VALUES: Dict[str, Any] = {
+    'add_user': False,
+    'remove_user': False,
+    'update_user_screening': False,
+    'start_screening_session': None,
+    'update_screening_session': False,
+    'complete_screening_session': None,
+    'add_campaign': False,
+    'reconcile_stats': {},
+    'archive_screening_sessions': 0,
+    'reclaim_free_pages': 0,
+    'add_managed_object': False,
+}
+
+def _fail_job(func: Callable, future: Future, error: Exception):
+    """Resolve a failed write job with its method's failure value. Internal jobs
+    without one (schema setup, flush) keep the exception."""
+    name = getattr(func, '__name__', None)
+    if name in WRITE_FAILURE_VALUES:
+        future.set_result(copy.copy(WRITE_FAILURE_VALUES[name]))
+    else:
+        future.set_exception(error)
+
+class ThreadConnectionManager(DatabaseManager):
+    """DatabaseManager that keeps one long-lived connection per thread.
+    
+    Each thread that uses the manager lazily opens its own connection and reuses
+    it for every later call, instead of reconnecting per operation.
+    """
+    
+    def __init__(self, db_path: str, read_only: bool = False):
+        # Schema setup is driven by AsyncDatabaseManager on the writer thread
+        self.db_path = db_path
+        self.read_only = read_only
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+    
+    def _connection(self) -> sqlite3.Connection:
+        """Get this thread's connection, opening it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            if self.read_only:
+                uri = f"file:{pathname2url(os.path.abspath(self.db_path))}?mode=ro"
+                conn = sqlite3.connect(uri, uri=True, isolation_level=None, check_same_thread=False)
+            else:
+                conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+                enable_incremental_vacuum(conn)
+                conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA busy_timeout = 5000')
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+    
+    def _prepare_file(self):
+        """File settings are applied when the writer connection is opened"""
+    
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Cursor]:
+        """Run the enclosed statements as one transaction.
+        
+        Inside an already open transaction (a group commit batch) the block runs
+        under a savepoint instead, so a failing job only rolls back its own work.
+        """
+        conn = self._connection()
+        cursor = conn.cursor()
+        if conn.in_transaction:
+            cursor.execute('SAVEPOINT write_job')
+            try:
+                yield cursor
+                cursor.execute('RELEASE write_job')
+            except Exception:
+                cursor.execute('ROLLBACK TO write_job')
+                cursor.execute('RELEASE write_job')
+                raise
+            return
+        
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            yield cursor
+            cursor.execute('COMMIT')
+        except Exception:
+            cursor.execute('ROLLBACK')
+            raise
+
+    @contextmanager
+    def _query(self) -> Iterator[sqlite3.Cursor]:
+        """Provide a cursor reading from one consistent snapshot"""
+        cursor = self._connection().cursor()
+        cursor.execute('BEGIN')
+        try:
+            yield cursor
+        finally:
+            cursor.execute('COMMIT')
+    
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Run every write in the block inside one transaction on this thread's connection"""
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+            conn.execute('COMMIT')
+        except Exception:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+    
+    def close(self):
+        """Close every connection opened by this manager"""
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+
+
+def open_backends(backend: str, db_path: str) -> Tuple[StorageBackend, StorageBackend]:
+    """Create the (writer, reader) storage pair for a STORAGE_BACKEND name"""
+    if backend == 'sqlite':
+        return ThreadConnectionManager(db_path), ThreadConnectionManager(db_path, read_only=True)
+    if backend == 'memory':
+        storage = InMemoryStorage()
+        return storage, storage
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+
+class AsyncDatabaseManager:
+    """Awaitable front-end for a StorageBackend that never blocks the event loop.
+    
+    All writes are serialised onto one dedicated writer thread. Reads run on a
+    small thread pool. With the default 'sqlite' backend the writer owns a single
+    WAL-mode connection and each reader thread holds its own read-only one, so
+    reads proceed concurrently with writes. The 'memory' backend keeps the same
+    semantics without touching disk.
+    
+    The writer group-commits: jobs that arrive within commit_interval_ms of the
+    first pending job share one transaction and one fsync. A write only resolves
+    after its batch has committed, so commit_interval_ms is the upper bound on
+    the extra latency batching adds to any single write.
+    
+    Users are served from a bounded LRU cache and campaigns from an in-memory
+    registry; every write method invalidates what it changed once committed.
+    """
+    
+    def __init__(self, db_path: str = 'rusk_media_bot.db', reader_pool_size: int = 4,
+                 commit_interval_ms: float = 5, max_batch_size: int = 256,
+                 user_cache_size: int = 10000, user_cache_ttl: float = 300,
+                 backend: str = 'sqlite'):
+        self.db_path = db_path
+        self.backend = backend
+        self._user_cache = LRUCache(maxsize=user_cache_size, ttl=user_cache_ttl)
+        self._campaigns: Optional[List[Dict]] = None
+        self._campaigns_generation = 0
+        self._campaign_hits = 0
+        self._campaign_misses = 0
+        self.commit_interval = commit_interval_ms / 1000
+        self.max_batch_size = max_batch_size
+        self._batches_committed = 0
+        self._writes_committed = 0
+        self._largest_batch = 0
+        self._last_commit_ms = 0.0
+        self._total_commit_ms = 0.0
+        self._slowest_commit_ms = 0.0
+        self._writer_db, self._reader_db = open_backends(backend, db_path)
+        self._write_queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._writer_thread = threading.Thread(target=self._writer_loop, name='db-writer', daemon=True)
+        self._writer_thread.start()
+        self._readers = ThreadPoolExecutor(max_workers=reader_pool_size, thread_name_prefix='db-reader')
+        self._closed = False
+        
+        # Create the schema before any reader opens the file
+        self._submit_write(self._writer_db.init_database).result()
+    
+    def _writer_loop(self):
+        """Collect queued write jobs into batches and commit each batch at once"""
+        stopping = False
+        while not stopping:
+            job = self._write_queue.get()
+            if job is None:
+                break
+            
+            batch = [job]
+            deadline = time.monotonic() + self.commit_interval
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                try:
+                    if timeout > 0:
+                        job = self._write_queue.get(timeout=timeout)
+                    else:
+                        job = self._write_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if job is None:
+                    stopping = True
+                    break
+                batch.append(job)
+            
+            self._commit_batch(batch)
+        self._writer_db.close()
+    
+    def _commit_batch(self, batch: List[tuple]):
+        """Run a batch of write jobs in one transaction, then resolve their futures"""
+        jobs = [job for job in batch if job[3].set_running_or_notify_cancel()]
+        if not jobs:
+            return
+        
+        started = time.perf_counter()
+        outcomes = []
+        try:
+            with self._writer_db.batch():
+                for func, args, kwargs, future in jobs:
+                    try:
+                        outcomes.append((future, func(*args, **kwargs), None))
+                    except Exception as e:
+                        outcomes.append((future, None, e))
+        except Exception as e:
+            # Nothing in the batch was committed
+            print(f"Error committing batch of {len(jobs)} writes: {e}")
+            for func, args, kwargs, future in jobs:
+                _fail_job(func, future, e)
+            return
+        
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self._batches_committed += 1
+        self._writes_committed += len(jobs)
+        self._largest_batch = max(self._largest_batch, len(jobs))
+        self._last_commit_ms = elapsed_ms
+        self._total_commit_ms += elapsed_ms
+        self._slowest_commit_ms = max(self._slowest_commit_ms, elapsed_ms)
+        
+        for (func, args, kwargs, future), (_, result, error) in zip(jobs, outcomes):
+            if error is not None:
+                print(f"Error in write job {getattr(func, '__name__', func)}: {error}")
+                _fail_job(func, future, error)
+            else:
+                future.set_result(result)
+
+    def _submit_write(self, func: Callable, *args, **kwargs) -> Future:
+        """Queue a write job for the writer thread"""
+        if self._closed:
+            raise RuntimeError("Database manager is closed")
+        future = Future()
+        self._write_queue.put((func, args, kwargs, future))
+        return future
+    
+    async def _write(self, func: Callable, *args, **kwargs) -> Any:
+        """Run a write method on the writer thread and await its result"""
+        return await asyncio.wrap_future(self._submit_write(func, *args, **kwargs))
+    
+    async def _read(self, func: Callable, *args) -> Any:
+        """Run a read method on the reader pool and await its result"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._readers, func, *args)
+    
+    async def flush(self):
+        """Wait until every write queued so far has been committed"""
+        await self._write(lambda: None)
+    
+    def get_write_stats(self) -> Dict:
+        """Get group commit batch size and latency counters"""
+        batches = self._batches_committed
+        return {
+            'batches_committed': batches,
+            'writes_committed': self._writes_committed,
+            'pending_writes': self._write_queue.qsize(),
+            'average_batch_size': self._writes_committed / batches if batches else 0.0,
+            'largest_batch': self._largest_batch,
+            'last_commit_ms': self._last_commit_ms,
+            'average_commit_ms': self._total_commit_ms / batches if batches else 0.0,
+            'slowest_commit_ms': self._slowest_commit_ms
+        }
+    
+    def get_cache_stats(self) -> Dict:
+        """Get user cache and campaign registry hit/miss counters"""
+        return {
+            'users': self._user_cache.get_stats(),
+            'campaigns': {
+                'loaded': self._campaigns is not None,
+                'hits': self._campaign_hits,
+                'misses': self._campaign_misses
+            }
+        }
+    
+    def _invalidate_campaigns(self):
+        """Drop the campaign registry so the next read reloads it"""
+        self._campaigns_generation += 1
+        self._campaigns = None
+    
+    async def close(self):
+        """Flush queued writes and close all connections"""
+        if self._closed:
+            return
+        self._closed = True
+        self._write_queue.put(None)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._writer_thread.join)
+        self._readers.shutdown(wait=True)
+        self._reader_db.close()
+    
+    async def add_user(self, user_id: int, username: str, display_name: str,
+                       campaign: str = None, invite_link: str = None) -> bool:
+        """Add a new user to the database"""
+        try:
+            return await self._write(self._writer_db.add_user, user_id, username, display_name,
+                                     campaign, invite_link)
+        finally:
+            self._user_cache.invalidate(user_id)
+    
+    async def get_user(self, user_id: int) -> Optional[Dict]:
+        """Get user information"""
+        user_data = self._user_cache.get(user_id)
+        if user_data is MISSING:
+            generation = self._user_cache.generation
+            user_data = await self._read(self._reader_db.get_user, user_id)
+            self._user_cache.put(user_id, user_data, generation=generation)
+        return copy.deepcopy(user_data)
+    
+    async def remove_user(self, user_id: int) -> bool:
+        """Remove user and all their data from the database"""
+        try:
+            return await self._write(self._writer_db.remove_user, user_id)
+        finally:
+            self._user_cache.invalidate(user_id)
+    
+    async def update_user_screening(self, user_id: int, screening_data: Dict,
+                                    roles_assigned: List[str]) -> bool:
+        """Update user's screening data and roles"""
+        try:
+            return await self._write(self._writer_db.update_user_screening, user_id,
+                                     screening_data, roles_assigned)
+        finally:
+            self._user_cache.invalidate(user_id)
+    
+    async def start_screening_session(self, user_id: int, campaign: str) -> int:
+        """Start a new screening session"""
+        return await self._write(self._writer_db.start_screening_session, user_id, campaign)
+    
+    async def update_screening_session(self, user_id: int, question: str, answer: Any) -> bool:
+        """Update screening session with new answer"""
+        return await self._write(self._writer_db.update_screening_session, user_id, question, answer)
+    
+    async def get_open_screening_session(self, user_id: int) -> Optional[Dict]:
+        """Get the user's latest unfinished screening session"""
+        return await self._read(self._reader_db.get_open_screening_session, user_id)
+    
+    async def complete_screening_session(self, user_id: int, answers: Optional[Dict] = None) -> Optional[Dict]:
+        """Complete screening session and return final answers"""
+        return await self._write(self._writer_db.complete_screening_session, user_id, answers)
+    
+    async def add_campaign(self, name: str, description: str, invite_link: str) -> bool:
+        """Add a new campaign"""
+        try:
+            return await self._write(self._writer_db.add_campaign, name, description, invite_link)
+        finally:
+            self._invalidate_campaigns()
+    
+    async def get_campaigns(self) -> List[Dict]:
+        """Get all campaigns"""
+        if self._campaigns is not None:
+            self._campaign_hits += 1
+            return [dict(campaign) for campaign in self._campaigns]
+        
+        self._campaign_misses += 1
+        generation = self._campaigns_generation
+        campaigns = await self._read(self._reader_db.get_campaigns)
+        if generation == self._campaigns_generation:
+            self._campaigns = campaigns
+        return [dict(campaign) for campaign in campaigns]
+    
+    async def get_user_stats(self) -> Dict:
+        """Get user statistics"""
+        return await self._read(self._reader_db.get_user_stats)
+    
+    async def reconcile_stats(self) -> Dict:
+        """Recompute the statistics counters and return the corrected drift"""
+        return await self._write(self._writer_db.reconcile_stats)
+    
+    async def archive_screening_sessions(self, max_age_days: float, batch_size: int = 500) -> int:
+        """Archive and delete one batch of old screening sessions. Returns how many were archived."""
+        return await self._write(self._writer_db.archive_screening_sessions, max_age_days, batch_size)
+    
+    async def reclaim_free_pages(self, max_pages: int = 1000) -> int:
+        """Return free pages to the filesystem. Returns pages freed."""
+        return await self._write(self._writer_db.reclaim_free_pages, max_pages)
+    
+    async def add_managed_object(self, guild_id: int, object_id: int, kind: str) -> bool:
+        """Record a role, channel or category the bot created"""
+        return await self._write(self._writer_db.add_managed_object, guild_id, object_id, kind)
+    
+    async def get_managed_objects(self, guild_id: int) -> Set[int]:
+        """Get the ids of every role, channel and category the bot created in a guild"""
+        return await self._read(self._reader_db.get_managed_objects, guild_id)
+    
+    async def export_to_path(self, dataset: str, path: str, file_format: str = 'csv') -> int:
+        """Stream 'users' or 'sessions' to a file from a reader thread. Returns rows written."""
+        return await self._read(export_to_path, self._reader_db, dataset, path, file_format)
+    
+    async def count_cohort(self, filters: Dict[str, str]) -> int:
+        """Count screened users matching every answer filter"""
+        return await self._read(self._reader_db.count_cohort, filters)
+    
+    async def get_segment_counts(self, group_by: List[str],
+                                 filters: Optional[Dict[str, str]] = None) -> Dict[Tuple[str, ...], int]:
+        """Count screened users per combination of answers to the group_by questions"""
+        return await self._read(self._reader_db.get_segment_counts, group_by, filters)
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the CPU work done when a member completes screening.
+
+Runs the pure-Python part of the completion path (validation, the profile ->
+roles/channels mapping, segments and the summary) over every answer set the
+questionnaire accepts, once with a cold mapping cache and then warm.
+
+Usage:
+    python bench_screening.py
+    python bench_screening.py --rounds 20
+"""
+
+import argparse
+import itertools
+import time
+from typing import Callable, Dict, List
+
+from screening_logic import QUESTIONNAIRE, ScreeningLogic, answer_space_size, map_answers
+
+def all_profiles() -> List[Dict]:
+    """Every complete answer set, with multi-select answers in every non-empty combination"""
+    choices = []
+    for key in QUESTIONNAIRE.order:
+        values = QUESTIONNAIRE.values[key]
+        if key in QUESTIONNAIRE.multi_select:
+            choices.append([list(combo) for size in range(1, len(values) + 1)
+                            for combo in itertools.combinations(values, size)])
+        else:
+            choices.append([[value] for value in values])
+    return [dict(zip(QUESTIONNAIRE.order, answers)) for answers in itertools.product(*choices)]
+
+def completion_path(logic: ScreeningLogic, screening_data: Dict):
+    """The CPU-bound steps of RuskMediaBot.complete_screening_dm"""
+    if logic.validate_screening_data(screening_data):
+        logic.determine_roles_and_channels(screening_data)
+        logic.get_user_segments(screening_data)
+        logic.get_screening_summary(screening_data)
+
+def measure(label: str, profiles: List[Dict], rounds: int, step: Callable[[Dict], None],
+            before_round: Callable[[], None] = lambda: None):
+    best = float('inf')
+    for _ in range(rounds):
+        before_round()
+        started = time.perf_counter()
+        for screening_data in profiles:
+            step(screening_data)
+        best = min(best, time.perf_counter() - started)
+    print(f"{label:<32} {best / len(profiles) * 1e6:8.2f} us/profile")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the screening completion path")
+    parser.add_argument('--rounds', type=int, default=10, help="Rounds per measurement; the best is reported")
+    args = parser.parse_args()
+
+    logic = ScreeningLogic()
+    profiles = all_profiles()
+    print(f"{len(profiles)} profiles, answer space {answer_space_size(QUESTIONNAIRE)}, "
+          f"questionnaire {QUESTIONNAIRE.version}")
+
+    measure("mapping (cold cache)", profiles, args.rounds,
+            logic.determine_roles_and_channels, map_answers.cache_clear)
+    measure("mapping (warm cache)", profiles, args.rounds, logic.determine_roles_and_channels)
+    measure("completion path (cold cache)", profiles, args.rounds,
+            lambda screening_data: completion_path(logic, screening_data), map_answers.cache_clear)
+    measure("completion path (warm cache)", profiles, args.rounds,
+            lambda screening_data: completion_path(logic, screening_data))
+    print(map_answers.cache_info())
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,14 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
 import asyncio
 import logging
+import time
 from datetime import datetime
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, Iterable, List, Any, Literal, NamedTuple, Tuple
 import os
+import re
+import tempfile
 
 # Try to load from railway_config first, then fall back to config
 try:
@@ -14,13 +17,36 @@ try:
 except ImportError:
     from config import *
     print("Using local configuration")
-from database import DatabaseManager
-from screening_logic import ScreeningLogic
+from admission import AdmissionQueue
+from async_database import AsyncDatabaseManager
+from guild_index import GuildIndex
+from scheduler import DiscordScheduler, Priority
+from single_flight import SingleFlight
+from screening_logic import QUESTIONNAIRE, ScreeningLogic
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Discord's per-guild caps, and how much of each pre-provisioning leaves free
+GUILD_ROLE_LIMIT = 250
+GUILD_CHANNEL_LIMIT = 500
+PREPROVISION_HEADROOM = 5
+CATEGORY_CHANNEL_LIMIT = 50
+
+# Cohort channels are sharded into one category per gender ("male cohorts"),
+# with numbered overflow categories ("male cohorts 2") once one is full. Only
+# those names count, so a human-made "staff cohorts" is never locked down
+COHORT_CATEGORY_PATTERN = re.compile(
+    r'^(?:%s) cohorts(?: \d+)?$' % '|'.join(map(re.escape, QUESTIONNAIRE.values['gender'])))
+
+class QuestionPrompt(NamedTuple):
+    """Prebuilt, read-only content of one screening question DM"""
+    embed: discord.Embed
+    options: Tuple[discord.SelectOption, ...]
+    placeholder: str
+    max_values: int
+
 class RuskMediaBot(commands.Bot):
     def __init__(self):
         intents = discord.Intents.default()
@@ -31,9 +57,26 @@ class RuskMediaBot(commands.Bot):
         
         super().__init__(command_prefix='!', intents=intents)
         
-        self.db = DatabaseManager(DATABASE_PATH)
+        self.db = AsyncDatabaseManager(
+            DATABASE_PATH,
+            reader_pool_size=DATABASE_READER_POOL_SIZE,
+            commit_interval_ms=DATABASE_COMMIT_INTERVAL_MS,
+            max_batch_size=DATABASE_MAX_BATCH_SIZE,
+            user_cache_size=USER_CACHE_SIZE,
+            user_cache_ttl=USER_CACHE_TTL_SECONDS,
+            backend=STORAGE_BACKEND
+        )
         self.screening_logic = ScreeningLogic()
         self.active_screenings = {}
+        self.guild_index = GuildIndex()
+        self.scheduler = DiscordScheduler(workers=DISCORD_SCHEDULER_WORKERS)
+        self.creation_flights = SingleFlight()
+        self.category_locks: Dict[tuple, asyncio.Lock] = {}
+        self.question_prompts: Dict[Tuple[str, str], QuestionPrompt] = {}
+        self.form_embeds: Dict[str, discord.Embed] = {}
+        self.admissions = AdmissionQueue(self.onboard_member, self.offboard_member,
+                                         workers=ONBOARDING_WORKERS, maxsize=ONBOARDING_QUEUE_SIZE)
+        self.permission_audit_task: Optional[asyncio.Task] = None
 
     async def start_screening_flow(self, member: discord.Member, campaign_label: str) -> bool:
         """Create DB records and attempt to DM the user the first question.
@@ -43,9 +86,23 @@ class RuskMediaBot(commands.Bot):
         if member.id in self.active_screenings:
             logger.info(f"User {member} already has an active screening session, skipping")
             return True
+        
+        # Resume a screening interrupted by a restart instead of starting over
+        screening = await self.restore_screening(member.id)
+        if screening:
+            logger.info(f"Resuming screening for {member} at {screening['current_question']}")
+            try:
+                if screening['current_question']:
+                    await self.send_screening_question_dm(member, screening['current_question'])
+                else:
+                    await self.complete_screening_dm(member, member.id)
+                return True
+            except discord.HTTPException as e:
+                logger.warning(f"Could not resume screening for {member} via DM: {e}")
+                return False
             
         # Ensure DB user exists
-        self.db.add_user(
+        await self.db.add_user(
             user_id=member.id,
             username=member.name,
             display_name=member.display_name,
@@ -53,7 +110,7 @@ class RuskMediaBot(commands.Bot):
         )
 
         # Start screening session
-        session_id = self.db.start_screening_session(member.id, campaign_label)
+        session_id = await self.db.start_screening_session(member.id, campaign_label)
         if not session_id:
             logger.error(f"Failed to start screening session for {member}")
             return False
@@ -61,23 +118,21 @@ class RuskMediaBot(commands.Bot):
         # Track active screening in-memory
         self.active_screenings[member.id] = {
             'session_id': session_id,
-            'current_question': 'gender',
+            'current_question': self.screening_logic.questionnaire.first,
             'answers': {}
         }
 
         # Send first question directly (no separate welcome message)
         try:
-            # Add small delay to prevent rate limiting when multiple users join quickly
-            await asyncio.sleep(1)
-            await self.send_screening_question_dm(member, 'gender')
+            await self.send_screening_question_dm(member, self.screening_logic.questionnaire.first)
             return True
         except discord.Forbidden:
             logger.warning(f"Could not DM {member}. DMs likely disabled.")
             return False
         except discord.HTTPException as e:
             if e.status == 400 and e.code == 40003:
-                logger.warning(f"Rate limited when DMing {member}. Will retry later.")
-                # Could implement retry logic here if needed
+                # The scheduler already retried with backoff
+                logger.warning(f"Still rate limited when DMing {member} after retries.")
                 return False
             else:
                 logger.error(f"HTTP error when DMing {member}: {e}")
@@ -85,6 +140,17 @@ class RuskMediaBot(commands.Bot):
     
     async def setup_hook(self):
         """Called when the bot is starting up"""
+        self.scheduler.start()
+        self.admissions.start()
+        # Route every question DM answer by its custom_id, including DMs sent
+        # before the last restart
+        self.add_dynamic_items(ScreeningAnswerSelect, ScreeningFormSelect, ScreeningFormSubmit)
+        self.add_view(ScreeningQuestionView(self))
+        self.reconcile_stats_task.start()
+        self.session_retention_task.start()
+        if PREPROVISION_COHORTS:
+            self.preprovision_task.start()
+        
         try:
             # Ensure application commands are added to the command tree
             try:
@@ -100,6 +166,18 @@ class RuskMediaBot(commands.Bot):
                         self.tree.add_command(self.start_screening, guild=discord.Object(id=GUILD_ID))
                     else:
                         self.tree.add_command(self.start_screening)
+                # Register merge_duplicates if present
+                if hasattr(self, 'merge_duplicates'):
+                    if GUILD_ID:
+                        self.tree.add_command(self.merge_duplicates, guild=discord.Object(id=GUILD_ID))
+                    else:
+                        self.tree.add_command(self.merge_duplicates)
+                # Register export_data if present
+                if hasattr(self, 'export_data'):
+                    if GUILD_ID:
+                        self.tree.add_command(self.export_data, guild=discord.Object(id=GUILD_ID))
+                    else:
+                        self.tree.add_command(self.export_data)
             except Exception as e:
                 logger.error(f"Failed to add app commands: {e}")
 
@@ -112,50 +190,179 @@ class RuskMediaBot(commands.Bot):
         except Exception as e:
             logger.error(f"Failed to sync commands: {e}")
     
+    async def close(self):
+        """Shut down the gateway connection, then flush and close the database"""
+        self.reconcile_stats_task.cancel()
+        self.session_retention_task.cancel()
+        self.preprovision_task.cancel()
+        if self.permission_audit_task:
+            self.permission_audit_task.cancel()
+        await self.admissions.stop()
+        await self.scheduler.stop()
+        await super().close()
+        await self.db.close()
+    
+    @tasks.loop(minutes=STATS_RECONCILE_INTERVAL_MINUTES)
+    async def reconcile_stats_task(self):
+        """Periodically recompute the admin_stats counters and report any drift"""
+        drift = await self.db.reconcile_stats()
+        if drift:
+            logger.warning(f"Statistics counters had drifted and were corrected: {drift}")
+        else:
+            logger.info("Statistics counters reconciled with no drift")
+    
+    @tasks.loop(minutes=SESSION_RETENTION_INTERVAL_MINUTES)
+    async def session_retention_task(self):
+        """Archive old screening sessions in small batches, then give the space back"""
+        archived = 0
+        while True:
+            batch = await self.db.archive_screening_sessions(SESSION_RETENTION_DAYS, SESSION_RETENTION_BATCH_SIZE)
+            archived += batch
+            if batch < SESSION_RETENTION_BATCH_SIZE:
+                break
+            # Let queued interactive writes go between batches
+            await asyncio.sleep(0.1)
+        
+        freed_pages = await self.db.reclaim_free_pages()
+        if archived or freed_pages:
+            logger.info(f"Archived {archived} screening sessions older than {SESSION_RETENTION_DAYS} days, freed {freed_pages} pages")
+    
+    @tasks.loop(minutes=PREPROVISION_INTERVAL_MINUTES)
+    async def preprovision_task(self):
+        """Create the missing cohort roles and channels ahead of time"""
+        for guild in self.guilds:
+            try:
+                await self.preprovision_guild(guild)
+            except Exception as e:
+                logger.error(f"Failed to pre-provision cohorts for {guild.name}: {e}")
+    
+    @preprovision_task.before_loop
+    async def before_preprovision_task(self):
+        await self.wait_until_ready()
+    
+    async def preprovision_guild(self, guild: discord.Guild):
+        """Create every missing role and channel of the cohort matrix, one at a time,
+        only while no other Discord actions are waiting"""
+        matrix = self.screening_logic.get_cohort_matrix()
+        missing_roles = [name for name in matrix['roles'] if not self.guild_index.get_role(guild, name)]
+        missing_channels = [name for name in matrix['channels'] if not self.guild_index.get_channel(guild, name)]
+        if not missing_roles and not missing_channels:
+            return
+        
+        logger.info(f"Pre-provisioning {len(missing_roles)} roles and {len(missing_channels)} channels in {guild.name}")
+        created = 0
+        for role_name in missing_roles:
+            # Leave room under Discord's role cap for roles created by hand
+            if len(guild.roles) >= GUILD_ROLE_LIMIT - PREPROVISION_HEADROOM:
+                logger.warning(f"Stopped pre-provisioning roles in {guild.name}: {len(guild.roles)} roles, near the limit")
+                break
+            await self.wait_until_quiet()
+            if await self.create_role_if_not_exists(guild, role_name, Priority.AUDIT):
+                created += 1
+            await asyncio.sleep(PREPROVISION_DELAY_SECONDS)
+        
+        for channel_name in missing_channels:
+            role = self.guild_index.get_role(guild, channel_name)
+            if not role:
+                continue  # a channel is only useful once its role exists
+            if len(guild.channels) >= GUILD_CHANNEL_LIMIT - PREPROVISION_HEADROOM:
+                logger.warning(f"Stopped pre-provisioning channels in {guild.name}: {len(guild.channels)} channels, near the limit")
+                break
+            await self.wait_until_quiet()
+            if await self.create_channel_if_not_exists(guild, channel_name, role, Priority.AUDIT):
+                created += 1
+            await asyncio.sleep(PREPROVISION_DELAY_SECONDS)
+        
+        logger.info(f"Pre-provisioned {created} cohort roles and channels in {guild.name}")
+    
+    async def wait_until_quiet(self):
+        """Wait until the scheduler has no other Discord actions queued or running"""
+        while not self.scheduler.is_idle():
+            await asyncio.sleep(1)
+    
     async def on_ready(self):
         """Called when the bot is ready"""
         logger.info(f'{self.user} has connected to Discord!')
         logger.info(f'Bot is in {len(self.guilds)} guild(s)')
         
+        # on_ready fires again after every reconnect; the startup work only runs once
+        if self.permission_audit_task is not None:
+            return
+        
+        # CRITICAL: Audit all channel permissions on startup to ensure security
+        self.permission_audit_task = asyncio.create_task(self.audit_channel_permissions())
+        
         # Initialize default campaigns
         await self.initialize_campaigns()
-        
-        # CRITICAL: Fix all channel permissions on startup to ensure security
-        for guild in self.guilds:
-            try:
-                await self.fix_channel_permissions(guild)
-                logger.info(f"Fixed channel permissions for guild: {guild.name}")
-            except Exception as e:
-                logger.error(f"Failed to fix channel permissions for {guild.name}: {e}")
+    
+    async def on_guild_available(self, guild: discord.Guild):
+        """Re-index a guild whose cache was (re)loaded from the gateway"""
+        self.guild_index.rebuild(guild)
+    
+    async def on_guild_join(self, guild: discord.Guild):
+        self.guild_index.rebuild(guild)
+    
+    async def on_guild_remove(self, guild: discord.Guild):
+        self.guild_index.forget(guild)
+    
+    async def on_guild_role_create(self, role: discord.Role):
+        self.guild_index.add_role(role)
+    
+    async def on_guild_role_delete(self, role: discord.Role):
+        self.guild_index.remove_role(role)
+    
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
+        self.guild_index.update_role(before, after)
+    
+    async def on_guild_channel_create(self, channel: discord.abc.GuildChannel):
+        self.guild_index.add_channel(channel)
+    
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
+        self.guild_index.remove_channel(channel)
+    
+    async def on_guild_channel_update(self, before: discord.abc.GuildChannel, after: discord.abc.GuildChannel):
+        self.guild_index.update_channel(before, after)
     
     async def initialize_campaigns(self):
         """Initialize default campaigns in the database"""
+        existing_names = {c['name'] for c in await self.db.get_campaigns()}
         for campaign_name in DEFAULT_CAMPAIGNS:
-            existing_campaigns = self.db.get_campaigns()
-            if not any(c['name'] == campaign_name for c in existing_campaigns):
-                self.db.add_campaign(
+            if campaign_name not in existing_names:
+                await self.db.add_campaign(
                     name=campaign_name,
                     description=f"Campaign for {campaign_name}",
                     invite_link=f"https://discord.gg/{campaign_name.lower()}"
                 )
                 logger.info(f"Initialized campaign: {campaign_name}")
     
-    async def create_role_if_not_exists(self, guild: discord.Guild, role_name: str) -> Optional[discord.Role]:
-        """Create a role if it doesn't exist"""
-        role = discord.utils.get(guild.roles, name=role_name)
+    async def create_role_if_not_exists(self, guild: discord.Guild, role_name: str,
+                                        priority: Priority = Priority.PROVISIONING) -> Optional[discord.Role]:
+        """Create a role if it doesn't exist. Concurrent calls for the same name
+        share one creation, so the guild never gets duplicates."""
+        role = self.guild_index.get_role(guild, role_name)
+        if role:
+            return role
+        return await self.creation_flights.do(('role', guild.id, role_name),
+                                              lambda: self._create_role(guild, role_name, priority))
+    
+    async def _create_role(self, guild: discord.Guild, role_name: str, priority: Priority) -> Optional[discord.Role]:
+        # A flight that finished just before this one started may have created it
+        role = self.guild_index.get_role(guild, role_name)
         if not role:
             try:
-                role = await guild.create_role(name=role_name)
+                role = await self.scheduler.run('role_create', priority,
+                                                lambda: guild.create_role(name=role_name), key=guild.id)
+                role = guild.get_role(role.id) or role
+                self.guild_index.add_role(role)
+                await self.db.add_managed_object(guild.id, role.id, 'role')
                 logger.info(f"Created role: {role_name}")
             except Exception as e:
                 logger.error(f"Failed to create role {role_name}: {e}")
         return role
     
-    async def create_channel_if_not_exists(self, guild: discord.Guild, channel_name: str, role: discord.Role = None) -> Optional[discord.TextChannel]:
-        """Create a private channel if it doesn't exist, or fix permissions if it does"""
-        channel = discord.utils.get(guild.channels, name=channel_name)
-        
-        # Define bulletproof secure permissions
+    def secure_overwrites(self, guild: discord.Guild, role: discord.Role = None) -> Dict:
+        """Build the overwrites of a private cohort channel: hidden from @everyone,
+        open to the bot and, if given, to the channel's role"""
         overwrites = {
             guild.default_role: discord.PermissionOverwrite(
                 read_messages=False, 
@@ -179,111 +386,295 @@ class RuskMediaBot(commands.Bot):
                 view_channel=True
             )  # Only this specific role can access
         
+        return overwrites
+    
+    @staticmethod
+    def overwrites_match(channel: discord.abc.GuildChannel, overwrites: Dict) -> bool:
+        """Check whether a channel already has exactly the given overwrites"""
+        current = {target.id: overwrite.pair() for target, overwrite in channel.overwrites.items()}
+        desired = {target.id: overwrite.pair() for target, overwrite in overwrites.items()}
+        return current == desired
+    
+    async def create_channel_if_not_exists(self, guild: discord.Guild, channel_name: str, role: discord.Role = None,
+                                           priority: Priority = Priority.PROVISIONING) -> Optional[discord.TextChannel]:
+        """Create a private channel if it doesn't exist. Concurrent calls for the same
+        name share one creation. Permissions of existing channels are left to
+        fix_channel_permissions."""
+        channel = self.guild_index.get_channel(guild, channel_name)
+        if channel:
+            return channel
+        return await self.creation_flights.do(('channel', guild.id, channel_name),
+                                              lambda: self._create_channel(guild, channel_name, role, priority))
+    
+    async def _create_channel(self, guild: discord.Guild, channel_name: str, role: Optional[discord.Role],
+                              priority: Priority) -> Optional[discord.TextChannel]:
+        channel = self.guild_index.get_channel(guild, channel_name)
         if not channel:
-            # Create new channel with secure permissions
-            try:
-                channel = await guild.create_text_channel(channel_name, overwrites=overwrites)
-                logger.info(f"Created secure channel: {channel_name}")
-            except Exception as e:
-                logger.error(f"Failed to create channel {channel_name}: {e}")
-        else:
-            # Channel exists - ensure it has secure permissions
-            try:
-                await channel.edit(overwrites=overwrites)
-                logger.info(f"Fixed permissions for existing channel: {channel_name}")
-            except Exception as e:
-                logger.error(f"Failed to fix permissions for channel {channel_name}: {e}")
+            # Create new channel with secure permissions, in its cohort category.
+            # Choosing the category and filling it happen under one lock per shard,
+            # so concurrent creations never overfill a category.
+            lock = self.category_locks.setdefault((guild.id, self.cohort_category_name(channel_name)), asyncio.Lock())
+            async with lock:
+                try:
+                    category = await self.get_cohort_category(guild, channel_name, priority)
+                    overwrites = self.secure_overwrites(guild, role)
+                    channel = await self.scheduler.run('channel_create', priority,
+                                                       lambda: guild.create_text_channel(channel_name, overwrites=overwrites,
+                                                                                         category=category),
+                                                       key=guild.id)
+                    channel = guild.get_channel(channel.id) or channel
+                    self.guild_index.add_channel(channel)
+                    await self.db.add_managed_object(guild.id, channel.id, 'channel')
+                    logger.info(f"Created secure channel: {channel_name} in {category.name if category else 'no category'}")
+                except Exception as e:
+                    logger.error(f"Failed to create channel {channel_name}: {e}")
         
         return channel
     
-    async def fix_channel_permissions(self, guild: discord.Guild):
-        """Fix permissions for all hierarchical channels to ensure proper access control"""
-        logger.info("Checking and fixing channel permissions...")
-        
-        # Find all hierarchical channels (channels with 3+ hyphens)
-        hierarchical_channels = []
-        for channel in guild.channels:
-            if isinstance(channel, discord.TextChannel) and channel.name.count('-') >= 3:
-                hierarchical_channels.append(channel)
-        
-        # Also find channels that might be user-specific (contain gender-age-content-tier pattern)
-        user_specific_channels = []
-        for channel in guild.channels:
-            if isinstance(channel, discord.TextChannel):
-                # Check if channel name matches pattern: gender-age-content-tier
-                parts = channel.name.split('-')
-                if len(parts) >= 4:
-                    # Check if it looks like a user-specific channel
-                    if parts[0] in ['male', 'female', 'non_binary'] and parts[3] in ['tier1', 'tier2', 'tier3']:
-                        user_specific_channels.append(channel)
-        
-        # Combine and deduplicate
-        all_channels_to_fix = list(set(hierarchical_channels + user_specific_channels))
-        
-        for channel in all_channels_to_fix:
+    @staticmethod
+    def cohort_category_name(channel_name: str, shard: int = 1) -> str:
+        """Name of the category a cohort channel belongs in"""
+        base = f"{channel_name.split('-')[0]} cohorts"
+        return base if shard == 1 else f"{base} {shard}"
+    
+    async def get_cohort_category(self, guild: discord.Guild, channel_name: str,
+                                  priority: Priority = Priority.PROVISIONING) -> Optional[discord.CategoryChannel]:
+        """Get the first category for a cohort channel that has room left,
+        creating the next overflow category when all are full"""
+        shard = 1
+        while True:
+            name = self.cohort_category_name(channel_name, shard)
+            category = self.guild_index.get_channel(guild, name)
+            if category is None:
+                return await self._create_category(guild, name, priority)
+            if self.guild_index.category_size(category) < CATEGORY_CHANNEL_LIMIT:
+                return category
+            shard += 1
+    
+    async def _create_category(self, guild: discord.Guild, name: str, priority: Priority) -> Optional[discord.CategoryChannel]:
+        try:
+            overwrites = self.secure_overwrites(guild)
+            category = await self.scheduler.run('channel_create', priority,
+                                                lambda: guild.create_category(name, overwrites=overwrites), key=guild.id)
+            category = guild.get_channel(category.id) or category
+            self.guild_index.add_channel(category)
+            await self.db.add_managed_object(guild.id, category.id, 'category')
+            logger.info(f"Created cohort category: {name}")
+            return category
+        except Exception as e:
+            logger.error(f"Failed to create category {name}, creating the channel without one: {e}")
+            return None
+    
+    def find_cohort_categories(self, guild: discord.Guild) -> List[discord.CategoryChannel]:
+        """Find all categories that hold cohort channels"""
+        return [category for category in guild.categories if COHORT_CATEGORY_PATTERN.match(category.name)]
+    
+    def find_cohort_channels(self, guild: discord.Guild) -> List[discord.TextChannel]:
+        """Find all hierarchical channels that need access control"""
+        channels = []
+        for channel in guild.text_channels:
+            parts = channel.name.split('-')
+            # Hierarchical channels (3+ hyphens), including the user-specific
+            # gender-age-content-tier pattern
+            if len(parts) >= 4:
+                channels.append(channel)
+        return channels
+    
+    async def fix_channel_permissions(self, guild: discord.Guild, channels: Optional[List[discord.TextChannel]] = None) -> int:
+        """Bring cohort categories and hierarchical channels to their secure
+        overwrites, editing only the ones whose overwrites differ. Checks every
+        cohort category and hierarchical channel in the guild unless given a scoped
+        list of channels, in which case only those and their categories are checked.
+        Returns the number of channels and categories edited.
+        """
+        if channels is None:
+            logger.info("Checking and fixing channel permissions...")
+            categories = self.find_cohort_categories(guild)
+            channels = self.find_cohort_channels(guild)
+        else:
+            categories = {channel.category for channel in channels
+                          if channel.category and COHORT_CATEGORY_PATTERN.match(channel.category.name)}
+        
+        edited = 0
+        # Categories hold the base overwrites that new channels in them start from
+        for category in categories:
+            if await self.reconcile_category_permissions(guild, category):
+                edited += 1
+        
+        for channel in channels:
+            if await self.reconcile_channel_permissions(guild, channel):
+                edited += 1
+        
+        logger.info(f"Checked {len(channels)} channels, fixed permissions on {edited}")
+        return edited
+    
+    async def reconcile_channel_permissions(self, guild: discord.Guild, channel: discord.abc.GuildChannel,
+                                            role: Optional[discord.Role] = None,
+                                            priority: Priority = Priority.PROVISIONING) -> Optional[bool]:
+        """Give one hierarchical channel its secure overwrites if they differ.
+        Returns True if the channel was edited, False if it was already secure
+        and None if the edit failed."""
+        try:
+            # Get the role that should have access to this channel
+            channel_role = role or self.guild_index.get_role(guild, channel.name)
+            if not channel_role:
+                # Even if no role exists, secure the channel so no one can see it
+                logger.warning(f"Could not find role for channel: {channel.name} - securing channel anyway")
+            
+            overwrites = self.secure_overwrites(guild, channel_role)
+            if self.overwrites_match(channel, overwrites):
+                return False
+            
+            await self.scheduler.run('channel_edit', priority, lambda: channel.edit(overwrites=overwrites), key=channel.id)
+            logger.info(f"Fixed permissions for channel: {channel.name}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to fix permissions for channel {channel.name}: {e}")
+            return None
+    
+    async def reconcile_category_permissions(self, guild: discord.Guild, category: discord.CategoryChannel,
+                                             priority: Priority = Priority.PROVISIONING) -> Optional[bool]:
+        """Give a cohort category the base secure overwrites (no role) if they differ.
+        Returns True if edited, False if already secure and None if the edit failed."""
+        try:
+            overwrites = self.secure_overwrites(guild)
+            if self.overwrites_match(category, overwrites):
+                return False
+            await self.scheduler.run('channel_edit', priority, lambda: category.edit(overwrites=overwrites), key=category.id)
+            logger.info(f"Fixed permissions for category: {category.name}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to fix permissions for category {category.name}: {e}")
+            return None
+    
+    async def audit_channel_permissions(self):
+        """Startup audit of every guild's hierarchical channels, run in the background.
+        Channels whose overwrites already match are skipped without an API call; the
+        rest are reconciled PERMISSION_AUDIT_CONCURRENCY at a time.
+        """
+        for guild in self.guilds:
             try:
-                # Get the role that should have access to this channel
-                channel_role = discord.utils.get(guild.roles, name=channel.name)
-                
-                if channel_role:
-                    # Set bulletproof secure permissions
-                    overwrites = {
-                        guild.default_role: discord.PermissionOverwrite(
-                            read_messages=False, 
-                            send_messages=False, 
-                            view_channel=False,
-                            connect=False,
-                            speak=False
-                        ),  # @everyone explicitly denied everything
-                        guild.me: discord.PermissionOverwrite(
-                            read_messages=True, 
-                            send_messages=True, 
-                            view_channel=True,
-                            manage_channels=True
-                        ),  # Bot has full access
-                        channel_role: discord.PermissionOverwrite(
-                            read_messages=True, 
-                            send_messages=True, 
-                            view_channel=True
-                        )  # Only this specific role can access
-                    }
-                    
-                    await channel.edit(overwrites=overwrites)
-                    logger.info(f"Fixed permissions for channel: {channel.name}")
-                else:
-                    logger.warning(f"Could not find role for channel: {channel.name} - securing channel anyway")
-                    # Even if no role exists, secure the channel so no one can see it
-                    overwrites = {
-                        guild.default_role: discord.PermissionOverwrite(
-                            read_messages=False, 
-                            send_messages=False, 
-                            view_channel=False,
-                            connect=False,
-                            speak=False
-                        ),  # @everyone explicitly denied everything
-                        guild.me: discord.PermissionOverwrite(
-                            read_messages=True, 
-                            send_messages=True, 
-                            view_channel=True,
-                            manage_channels=True
-                        )  # Bot has full access
-                    }
-                    await channel.edit(overwrites=overwrites)
-                    logger.info(f"Secured channel without role: {channel.name}")
-                    
+                await self.sweep_duplicates(guild)
+                await self.audit_guild_permissions(guild)
             except Exception as e:
-                logger.error(f"Failed to fix permissions for channel {channel.name}: {e}")
+                logger.error(f"Failed to audit channel permissions for {guild.name}: {e}")
+    
+    async def audit_guild_permissions(self, guild: discord.Guild):
+        """Audit the hierarchical channels of one guild"""
+        started = time.monotonic()
+        for category in self.find_cohort_categories(guild):
+            await self.reconcile_category_permissions(guild, category, Priority.AUDIT)
+        channels = self.find_cohort_channels(guild)
+        semaphore = asyncio.Semaphore(PERMISSION_AUDIT_CONCURRENCY)
+        progress = {'done': 0, 'skipped': 0, 'edited': 0, 'failed': 0}
+        report_every = max(1, len(channels) // 10)
+        logger.info(f"Auditing permissions of {len(channels)} channels in {guild.name}")
+        
+        async def audit(channel: discord.TextChannel):
+            async with semaphore:
+                result = await self.reconcile_channel_permissions(guild, channel, priority=Priority.AUDIT)
+            if result is None:
+                progress['failed'] += 1
+            elif result:
+                progress['edited'] += 1
+            else:
+                progress['skipped'] += 1
+            
+            progress['done'] += 1
+            if progress['done'] % report_every == 0:
+                logger.info(f"Permission audit of {guild.name}: {progress['done']}/{len(channels)} channels")
+        
+        await asyncio.gather(*(audit(channel) for channel in channels))
+        
+        logger.info(f"Permission audit of {guild.name} finished in {time.monotonic() - started:.1f}s: "
+                    f"{progress['skipped']} unchanged, {progress['edited']} fixed, {progress['failed']} failed")
+    
+    def is_managed_name(self, name: str) -> bool:
+        """Check whether a role or channel name is one a screening can map to"""
+        return name in self.screening_logic.cohort_names
+    
+    async def sweep_duplicates(self, guild: discord.Guild, merge: bool = False) -> Dict[str, Any]:
+        """Find cohort roles and channels that share a name and report them.
+        With merge, members of duplicate roles are moved to the oldest role and the
+        duplicates deleted, and duplicate channels without messages are deleted.
+        Duplicate channels with history are only reported. Merging only touches
+        roles and channels the bot itself created.
+        """
+        report = {'roles': [], 'channels': [], 'merged_roles': 0, 'deleted_channels': 0, 'kept_channels': []}
+        created_by_bot = await self.db.get_managed_objects(guild.id) if merge else set()
+        
+        for name, roles in self.guild_index.duplicate_roles(guild).items():
+            if not self.is_managed_name(name):
+                continue
+            report['roles'].append(name)
+            if not merge:
+                continue
+            roles = [role for role in roles if role.id in created_by_bot]
+            if len(roles) < 2:
+                continue
+            keep, duplicates = roles[0], roles[1:]
+            for duplicate in duplicates:
+                try:
+                    for member in duplicate.members:
+                        if keep not in member.roles:
+                            await self.scheduler.run('member_roles', Priority.AUDIT,
+                                                     lambda member=member: member.add_roles(keep), key=guild.id)
+                    await self.scheduler.run('role_delete', Priority.AUDIT,
+                                             lambda duplicate=duplicate: duplicate.delete(reason="Merged duplicate cohort role"),
+                                             key=guild.id)
+                    report['merged_roles'] += 1
+                except Exception as e:
+                    logger.error(f"Failed to merge duplicate role {name} ({duplicate.id}): {e}")
+        
+        for name, channels in self.guild_index.duplicate_channels(guild).items():
+            if not self.is_managed_name(name):
+                continue
+            report['channels'].append(name)
+            if not merge:
+                continue
+            channels = [channel for channel in channels if channel.id in created_by_bot]
+            for duplicate in channels[1:]:
+                if getattr(duplicate, 'last_message_id', None) is not None:
+                    report['kept_channels'].append(f"{name} ({duplicate.id})")
+                    continue
+                try:
+                    await self.scheduler.run('channel_delete', Priority.AUDIT,
+                                             lambda duplicate=duplicate: duplicate.delete(reason="Removed empty duplicate cohort channel"),
+                                             key=duplicate.id)
+                    report['deleted_channels'] += 1
+                except Exception as e:
+                    logger.error(f"Failed to delete duplicate channel {name} ({duplicate.id}): {e}")
         
-        logger.info(f"Completed permission fix for {len(all_channels_to_fix)} channels")
+        if report['roles'] or report['channels']:
+            logger.warning(f"Duplicate cohort roles in {guild.name}: {report['roles']}; "
+                           f"duplicate cohort channels: {report['channels']}")
+        if merge:
+            logger.info(f"Merged {report['merged_roles']} duplicate roles and deleted {report['deleted_channels']} "
+                        f"empty duplicate channels in {guild.name}; kept {len(report['kept_channels'])} with history")
+        return report
     
     async def on_member_join(self, member):
-        """Called when a member joins the server - AUTOMATICALLY START SCREENING"""
-        logger.info(f"Member {member} joined the server - Auto-starting screening")
+        """Called when a member joins the server - queue them for screening"""
+        logger.info(f"Member {member} joined the server - Queued for screening")
+        self.admissions.submit_join(member)
+    
+    async def on_member_remove(self, member):
+        """Called when a member leaves the server"""
+        self.admissions.submit_leave(member)
+    
+    async def offboard_member(self, member: discord.Member):
+        """Drop the in-memory screening of a member who left"""
+        if self.active_screenings.pop(member.id, None) is not None:
+            logger.info(f"Dropped active screening for {member}, who left the server")
+    
+    async def onboard_member(self, member: discord.Member):
+        """AUTOMATICALLY START SCREENING for a member taken off the admission queue"""
+        logger.info(f"Onboarding {member} - Auto-starting screening")
         
         # ALWAYS treat joining users as new users (including rejoins)
         # Clear any previous screening data to ensure fresh start
         logger.info(f"Treating {member} as new user - clearing previous data if any")
-        self.db.remove_user(member.id)  # Clear previous screening data
+        await self.db.remove_user(member.id)  # Clear previous screening data
         
         # Also clear any active screening sessions
         if member.id in self.active_screenings:
@@ -298,7 +689,8 @@ class RuskMediaBot(commands.Bot):
         
         if roles_to_remove:
             try:
-                await member.remove_roles(*roles_to_remove)
+                await self.scheduler.run('member_roles', Priority.PROVISIONING,
+                                         lambda: member.remove_roles(*roles_to_remove), key=member.guild.id)
                 logger.info(f"Removed {len(roles_to_remove)} old roles from {member} for fresh start")
             except Exception as e:
                 logger.error(f"Failed to remove old roles from {member}: {e}")
@@ -310,79 +702,173 @@ class RuskMediaBot(commands.Bot):
             welcome_channel_name = os.getenv('WELCOME_CHANNEL', '').strip()
             channel_to_use = None
             if welcome_channel_name:
-                channel_to_use = discord.utils.get(member.guild.text_channels, name=welcome_channel_name)
+                channel_to_use = self.guild_index.get_text_channel(member.guild, welcome_channel_name)
             # Fallback to system channel if available
             if not channel_to_use:
                 channel_to_use = member.guild.system_channel
             # Final fallback to a channel named "general" if present
             if not channel_to_use:
-                channel_to_use = discord.utils.get(member.guild.text_channels, name="general")
+                channel_to_use = self.guild_index.get_text_channel(member.guild, "general")
             if channel_to_use:
                 view = StartScreeningView(self)
-                await channel_to_use.send(
+                await self.scheduler.run('message', Priority.INTERACTIVE, lambda: channel_to_use.send(
                     f"{member.mention} Welcome! Your DMs seem disabled. Enable DMs for this server and press the button to begin.",
                     view=view
-                )
+                ), key=channel_to_use.id)
     
-    async def send_screening_question_dm(self, member: discord.Member, question_key: str):
-        """Send a screening question via DM"""
+    async def restore_screening(self, user_id: int) -> Optional[Dict]:
+        """Rebuild in-memory screening state from the user's open session after a restart"""
+        session = await self.db.get_open_screening_session(user_id)
+        if not session:
+            return None
+        
+        answers = session['answers']
+        screening = self.active_screenings.setdefault(user_id, {
+            'session_id': session['session_id'],
+            'current_question': self.screening_logic.get_first_unanswered_question(answers),
+            'answers': answers
+        })
+        logger.info(f"Restored screening session {session['session_id']} for user {user_id} "
+                    f"with {len(answers)} answer(s)")
+        return screening
+    
+    async def send_dm(self, member: discord.Member, **content) -> discord.Message:
+        """DM a member through the scheduler. Sends are paced per recipient, and
+        sends that have to open the DM channel first are also paced bot-wide."""
+        return await self.scheduler.run('dm', Priority.INTERACTIVE, lambda: member.send(**content), key=member.id,
+                                        shared_route='dm_open' if member.dm_channel is None else None)
+    
+    async def resolve_member(self, user: discord.abc.User) -> Optional[discord.Member]:
+        """Find the guild member behind a DM interaction"""
+        if isinstance(user, discord.Member):
+            return user
+        
+        for guild in self.guilds:
+            member = guild.get_member(user.id)
+            if member:
+                return member
+        
+        guild = self.get_guild(GUILD_ID) if GUILD_ID else None
+        if guild:
+            try:
+                return await guild.fetch_member(user.id)
+            except discord.HTTPException:
+                pass
+        return None
+    
+    def get_question_prompt(self, question_key: str) -> Optional[QuestionPrompt]:
+        """Get the embed and select options for a screening question, built once
+        per question and questionnaire version and shared by every DM"""
+        questionnaire = self.screening_logic.questionnaire
+        cache_key = (questionnaire.version, question_key)
+        prompt = self.question_prompts.get(cache_key)
+        if prompt is not None:
+            return prompt
+        
         question_data = self.screening_logic.questions.get(question_key)
         if not question_data:
-            logger.error(f"Invalid question key: {question_key}")
-            return
+            return None
         
+        total = len(questionnaire.order)
         # For the first question, include welcome message
-        if question_key == 'gender':
+        if question_key == questionnaire.first:
             embed = discord.Embed(
                 title="Welcome to Rusk Media Community! 🎬",
-                description="Thank you for joining! Please complete this quick 4-question screening to get access to your personalized content channels.\n\n**Question 1/4:** " + question_data['question'],
+                description=f"Thank you for joining! Please complete this quick {total}-question screening to get access to your personalized content channels.\n\n**Question 1/{total}:** " + question_data['question'],
                 color=0x00ff00
             )
             embed.set_footer(text="This helps us match you with the right content and communities!")
         else:
             embed = discord.Embed(
-                title=f"Question {self.get_question_number(question_key)}/4 📋",
+                title=f"Question {self.get_question_number(question_key)}/{total} 📋",
                 description=question_data['question'],
                 color=0x0099ff
             )
         
-        # Create select menu
-        options = []
-        for option in question_data['options']:
-            label = option['label']
-            
-            # Limit label length to 100 characters (Discord limit)
-            if len(label) > 100:
-                label = label[:97] + "..."
-            
-            options.append(discord.SelectOption(
-                label=label,
-                value=option['value']
-            ))
+        # Limit label length to 100 characters (Discord limit)
+        options = tuple(
+            discord.SelectOption(label=label if len(label) <= 100 else label[:97] + "...", value=value)
+            for value, label in questionnaire.labels[question_key].items()
+        )
         
         # Handle multi-select for show_types
-        if question_key in ['show_types']:
-            select = discord.ui.Select(
-                placeholder="Select all that apply...",
-                options=options,
-                max_values=len(options),
-                custom_id=f"screening_{question_key}"
-            )
+        if question_key in questionnaire.multi_select:
+            prompt = QuestionPrompt(embed, options, "Select all that apply...", len(options))
         else:
-            select = discord.ui.Select(
-                placeholder="Choose one option...",
-                options=options,
-                max_values=1,
-                custom_id=f"screening_{question_key}"
+            prompt = QuestionPrompt(embed, options, "Choose one option...", 1)
+        self.question_prompts[cache_key] = prompt
+        return prompt
+    
+    def build_question_select(self, question_key: str, custom_id: Optional[str] = None,
+                              placeholder: Optional[str] = None, row: Optional[int] = None) -> Optional[discord.ui.Select]:
+        """Build the answer select menu for a screening question"""
+        prompt = self.get_question_prompt(question_key)
+        if prompt is None:
+            return None
+        return discord.ui.Select(
+            placeholder=placeholder or prompt.placeholder,
+            options=list(prompt.options),
+            max_values=prompt.max_values,
+            custom_id=custom_id or f"screening_{question_key}",
+            row=row
+        )
+    
+    def get_form_embed(self) -> discord.Embed:
+        """Get the embed of the single-message screening form, built once per
+        questionnaire version"""
+        questionnaire = self.screening_logic.questionnaire
+        embed = self.form_embeds.get(questionnaire.version)
+        if embed is None:
+            total = len(questionnaire.order)
+            embed = discord.Embed(
+                title="Welcome to Rusk Media Community! 🎬",
+                description=f"Thank you for joining! Please answer these {total} quick questions to get access to your personalized content channels, then press **Submit**.",
+                color=0x00ff00
             )
+            embed.set_footer(text="This helps us match you with the right content and communities!")
+            self.form_embeds[questionnaire.version] = embed
+        return embed
+    
+    def build_screening_form(self, user_id: int, answers: Optional[Dict] = None) -> discord.ui.View:
+        """Build the single-message screening form, with any saved answers preselected"""
+        questionnaire = self.screening_logic.questionnaire
+        answers = answers or {}
+        view = discord.ui.View(timeout=None)
+        for row, question_key in enumerate(questionnaire.order):
+            question = f"{questionnaire.numbers[question_key]}. {self.screening_logic.questions[question_key]['question']}"
+            view.add_item(ScreeningFormSelect.for_question(self, question_key, user_id, question, row,
+                                                           answers.get(question_key, ())))
+        view.add_item(ScreeningFormSubmit.for_user(user_id, len(questionnaire.order)))
+        return view
+    
+    async def send_screening_form_dm(self, member: discord.Member):
+        """Send every screening question as one DM with a select per question and a submit button"""
+        screening = self.active_screenings.get(member.id)
+        view = self.build_screening_form(member.id, screening['answers'] if screening else None)
+        
+        try:
+            await self.send_dm(member, embed=self.get_form_embed(), view=view)
+        except discord.Forbidden:
+            logger.error(f"Cannot send DM to {member}")
+    
+    async def send_screening_question_dm(self, member: discord.Member, question_key: str):
+        """Send a screening question via DM"""
+        if SCREENING_FORM_MODE:
+            # Every question goes out in one form message instead
+            await self.send_screening_form_dm(member)
+            return
         
-        select.callback = lambda i: self.handle_screening_answer_dm(i, question_key, member)
+        prompt = self.get_question_prompt(question_key)
+        if prompt is None:
+            logger.error(f"Invalid question key: {question_key}")
+            return
         
+        # The select is routed by its custom_id, so the view is not kept around
         view = discord.ui.View(timeout=None)
-        view.add_item(select)
+        view.add_item(ScreeningAnswerSelect.for_question(self, question_key, member.id))
         
         try:
-            await member.send(embed=embed, view=view)
+            await self.send_dm(member, embed=prompt.embed, view=view)
         except discord.Forbidden:
             logger.error(f"Cannot send DM to {member}")
     
@@ -390,7 +876,7 @@ class RuskMediaBot(commands.Bot):
         """Handle user's answer to a screening question in DM"""
         user_id = member.id
         
-        if user_id not in self.active_screenings:
+        if user_id not in self.active_screenings and not await self.restore_screening(user_id):
             await interaction.response.send_message("No active screening session found. Please rejoin the server to restart.", ephemeral=True)
             return
         
@@ -399,7 +885,7 @@ class RuskMediaBot(commands.Bot):
         
         # Store answer
         self.active_screenings[user_id]['answers'][question_key] = selected_values
-        self.db.update_screening_session(user_id, question_key, selected_values)
+        await self.db.update_screening_session(user_id, question_key, selected_values)
         
         # Debug: Log what the user selected
         logger.info(f"User {member} selected for {question_key}: {selected_values}")
@@ -413,25 +899,91 @@ class RuskMediaBot(commands.Bot):
         if next_question:
             # Continue with next question
             self.active_screenings[user_id]['current_question'] = next_question
-            await asyncio.sleep(0.5)
             await self.send_screening_question_dm(member, next_question)
         else:
             # Screening complete
             await self.complete_screening_dm(member, user_id)
     
-    async def complete_screening_dm(self, member: discord.Member, user_id: int):
-        """Complete the screening process and assign roles"""
+    async def handle_screening_form_answer(self, interaction: discord.Interaction, question_key: str, user_id: int):
+        """Record a form answer as it is picked, so it survives a restart.
+
+        This costs one session write per answer, the same as the per-question
+        flow, rather than saving the whole form in the completion write alone.
+        Durability across restarts was chosen over the single write."""
+        if user_id not in self.active_screenings and not await self.restore_screening(user_id):
+            await interaction.response.send_message("No active screening session found. Please rejoin the server to restart.", ephemeral=True)
+            return
+        
+        selected_values = interaction.data['values']
+        self.active_screenings[user_id]['answers'][question_key] = selected_values
+        # Acknowledge without a message; the select keeps showing the choice
+        await interaction.response.defer()
+        await self.db.update_screening_session(user_id, question_key, selected_values)
+    
+    async def handle_screening_form_submit(self, interaction: discord.Interaction, member: discord.Member):
+        """Complete the screening from a submitted form. If completion fails the
+        form is put back so the member can submit again."""
+        user_id = member.id
+        if user_id not in self.active_screenings and not await self.restore_screening(user_id):
+            await interaction.response.send_message("No active screening session found. Please rejoin the server to restart.", ephemeral=True)
+            return
+        
+        screening = self.active_screenings[user_id]
+        if screening.get('submitted'):
+            await interaction.response.defer()
+            return
+        
+        questionnaire = self.screening_logic.questionnaire
+        answers = screening['answers']
+        missing = [str(questionnaire.numbers[key]) for key in questionnaire.order
+                   if not answers.get(key) or not set(answers[key]) <= questionnaire.valid_values[key]]
+        if missing:
+            await interaction.response.send_message(f"❗ Please answer question{'s' if len(missing) > 1 else ''} {', '.join(missing)} before submitting.", ephemeral=True)
+            return
+        
+        screening['submitted'] = True
+        screening['current_question'] = None
+        logger.info(f"User {member} submitted screening form: {screening['answers']}")
+        
+        # Update the form in place while roles and channels are set up
+        embed = discord.Embed(
+            title="Screening Submitted ✅",
+            description="Setting up your personalized channels...",
+            color=0x0099ff
+        )
+        await interaction.response.edit_message(embed=embed, view=None)
+        try:
+            await self.complete_screening_dm(member, user_id, interaction)
+        except Exception as e:
+            logger.error(f"Failed to complete screening form for {member}: {e}")
+            screening['submitted'] = False
+            embed = discord.Embed(
+                title="Something Went Wrong ❗",
+                description="We couldn't finish setting up your channels. Your answers are saved, so please press **Submit** to try again.",
+                color=0xff9900
+            )
+            try:
+                await interaction.edit_original_response(embed=embed, view=self.build_screening_form(user_id, answers))
+            except discord.HTTPException:
+                # The interaction token may have expired; send a fresh form instead
+                await self.send_screening_form_dm(member)
+    
+    async def complete_screening_dm(self, member: discord.Member, user_id: int,
+                                    interaction: Optional[discord.Interaction] = None):
+        """Complete the screening process and assign roles. Given the interaction
+        that submitted a screening form, the form message shows the result
+        instead of a new DM being sent."""
         screening_data = self.active_screenings[user_id]['answers']
         
         # Validate screening data
         if not self.screening_logic.validate_screening_data(screening_data):
-            await member.send("❌ Screening incomplete. Please rejoin the server to restart.")
+            await self.send_screening_result(member, interaction, content="❌ Screening incomplete. Please rejoin the server to restart.")
             return
         
         # Determine roles and channels to create
         role_channel_data = self.screening_logic.determine_roles_and_channels(screening_data)
         roles_to_create = role_channel_data['roles']
-        channels_to_create = role_channel_data['channels']
+        role_channel_pairs = role_channel_data['pairs']
         
         # Debug: Log the user's screening data
         logger.info(f"Screening data for {member}: {screening_data}")
@@ -445,12 +997,14 @@ class RuskMediaBot(commands.Bot):
         user_segments = self.screening_logic.get_user_segments(screening_data)
         
         # Update database
-        self.db.update_user_screening(user_id, screening_data, roles_to_create)
+        await self.db.update_user_screening(user_id, screening_data, roles_to_create)
+        await self.db.complete_screening_session(user_id, screening_data)
         
         # Create and assign roles/channels
         guild = member.guild
         assigned_roles = []
         created_channels = []
+        member_channels = []
         
         # First, remove any old hierarchical roles that don't match the user's current gender
         user_gender = screening_data.get('gender', ['unknown'])[0]
@@ -472,59 +1026,57 @@ class RuskMediaBot(commands.Bot):
                     old_roles_to_remove.append(role)
                     logger.info(f"Will remove old role: {role_name} from {member} (reason: {'not in new roles' if role_name not in roles_to_create else 'wrong gender'})")
         
-        # Remove old roles
-        if old_roles_to_remove:
-            try:
-                await member.remove_roles(*old_roles_to_remove)
-                logger.info(f"Removed {len(old_roles_to_remove)} old roles from {member}")
-            except Exception as e:
-                logger.error(f"Failed to remove old roles: {e}")
-        
-        for i, role_name in enumerate(roles_to_create):
-            # CRITICAL CHECK: Ensure this role is actually in our roles_to_create list
-            if role_name not in roles_to_create:
-                logger.error(f"CRITICAL ERROR: Role {role_name} not in roles_to_create list!")
-                continue
-            
-            # Safety check: Ensure role gender matches user gender
+        # Safety check: never assign a hierarchical role for another gender
+        role_names = []
+        for role_name in roles_to_create:
             if role_name != "Screened User" and role_name.count('-') >= 2:
                 role_gender = role_name.split('-')[0]
                 if role_gender != user_gender:
                     logger.error(f"CRITICAL ERROR: Attempted to assign {role_name} (gender: {role_gender}) to user {member} (gender: {user_gender})")
                     continue  # Skip this role assignment
-            
-            # Create role if doesn't exist
-            role = await self.create_role_if_not_exists(guild, role_name)
-            
-            if role:
-                # Assign role to user
-                if role not in member.roles:
-                    try:
-                        await member.add_roles(role)
-                        assigned_roles.append(role_name)
-                        logger.info(f"Assigned role {role_name} to {member}")
-                    except Exception as e:
-                        logger.error(f"Failed to assign role {role_name}: {e}")
-                else:
-                    logger.info(f"User {member} already has role {role_name}")
-                
-                # Create corresponding channel if doesn't exist
-                if i < len(channels_to_create):
-                    channel_name = channels_to_create[i]
-                    channel = await self.create_channel_if_not_exists(guild, channel_name, role)
-                    if channel:
-                        created_channels.append(channel_name)
+            role_names.append(role_name)
+        
+        # Create any missing roles concurrently
+        roles = await asyncio.gather(*(self.create_role_if_not_exists(guild, role_name) for role_name in role_names))
+        roles_by_name = {role.name: role for role in roles if role}
+        
+        # Apply the whole role set in one member edit: keep unrelated roles, drop
+        # the old hierarchical ones, add the new ones
+        desired_roles = [role for role in member.roles if not role.is_default() and role not in old_roles_to_remove]
+        for role in roles_by_name.values():
+            if role in desired_roles:
+                logger.info(f"User {member} already has role {role.name}")
+            else:
+                desired_roles.append(role)
+                assigned_roles.append(role.name)
+        
+        if set(desired_roles) != {role for role in member.roles if not role.is_default()}:
+            try:
+                await self.scheduler.run('member_roles', Priority.PROVISIONING,
+                                         lambda: member.edit(roles=desired_roles), key=guild.id)
+                logger.info(f"Updated roles for {member}: removed {len(old_roles_to_remove)}, assigned {assigned_roles}")
+            except Exception as e:
+                logger.error(f"Failed to update roles for {member}: {e}")
+                assigned_roles = []
+        
+        # Create each channel with access for the role it is paired with
+        channels = await asyncio.gather(*(self.create_channel_if_not_exists(guild, channel_name, roles_by_name[role_name])
+                                          for role_name, channel_name in role_channel_pairs if role_name in roles_by_name))
+        for channel in channels:
+            if channel:
+                created_channels.append(channel.name)
+                member_channels.append(channel)
         
         # Debug: Log final roles after assignment
         final_roles = [role.name for role in member.roles]
         logger.info(f"Final roles for {member} after assignment: {final_roles}")
         
-        # CRITICAL: Force fix permissions for all channels after role assignment
+        # CRITICAL: Make sure this member's channels are secured after role assignment
         try:
-            await self.fix_channel_permissions(guild)
-            logger.info(f"Force-fixed permissions after role assignment for {member}")
+            await self.fix_channel_permissions(guild, member_channels)
+            logger.info(f"Checked channel permissions after role assignment for {member}")
         except Exception as e:
-            logger.error(f"Failed to force-fix permissions: {e}")
+            logger.error(f"Failed to fix channel permissions: {e}")
         
         # Send completion message
         embed = discord.Embed(
@@ -552,7 +1104,7 @@ class RuskMediaBot(commands.Bot):
             inline=False
         )
         
-        await member.send(embed=embed)
+        await self.send_screening_result(member, interaction, embed=embed)
         
         # Clean up active screening
         del self.active_screenings[user_id]
@@ -560,31 +1112,37 @@ class RuskMediaBot(commands.Bot):
         
         # Send welcome message to channels
         for channel_name in created_channels:
-            channel = discord.utils.get(guild.channels, name=channel_name)
+            channel = self.guild_index.get_channel(guild, channel_name)
             if channel:
                 embed = discord.Embed(
                     title="New Member! 🎉",
                     description=f"Welcome {member.mention} to this group!",
                     color=0x0099ff
                 )
-                try:
-                    await channel.send(embed=embed)
-                except:
-                    pass
+                # Lowest priority and not awaited: nobody is waiting on these
+                self.scheduler.submit('message', Priority.ANNOUNCEMENT,
+                                      lambda channel=channel, embed=embed: channel.send(embed=embed),
+                                      key=channel.id, background=True)
+    
+    async def send_screening_result(self, member: discord.Member, interaction: Optional[discord.Interaction] = None, **content):
+        """Show the outcome of a screening on its form message, or in a new DM"""
+        if interaction is not None:
+            try:
+                await interaction.edit_original_response(view=None, **content)
+                return
+            except discord.HTTPException as e:
+                logger.warning(f"Could not update screening form for {member}, sending a DM instead: {e}")
+        await self.send_dm(member, **content)
     
     def get_question_number(self, question_key: str) -> int:
         """Get the question number for display"""
-        question_order = ['gender', 'age_group', 'show_types', 'city_tier']
-        try:
-            return question_order.index(question_key) + 1
-        except ValueError:
-            return 1
+        return self.screening_logic.get_question_number(question_key)
     
     @app_commands.command(name="admin_stats", description="Get screening statistics (Admin only)")
     @app_commands.default_permissions(administrator=True)
     async def admin_stats(self, interaction: discord.Interaction):
         """Get screening statistics for admins"""
-        stats = self.db.get_user_stats()
+        stats = await self.db.get_user_stats()
         
         embed = discord.Embed(
             title="Screening Statistics 📊",
@@ -599,17 +1157,84 @@ class RuskMediaBot(commands.Bot):
             campaign_text = "\n".join([f"{campaign}: {count}" for campaign, count in campaign_stats.items()])
             embed.add_field(name="Users by Campaign", value=campaign_text, inline=False)
         
+        write_stats = self.db.get_write_stats()
+        embed.add_field(
+            name="Database Writes",
+            value=(f"{write_stats['writes_committed']} writes in {write_stats['batches_committed']} commits "
+                   f"(avg batch {write_stats['average_batch_size']:.1f}, max {write_stats['largest_batch']})\n"
+                   f"Commit latency: avg {write_stats['average_commit_ms']:.1f}ms, "
+                   f"max {write_stats['slowest_commit_ms']:.1f}ms"),
+            inline=False
+        )
+        
+        scheduler_stats = self.scheduler.get_stats()
+        queued_by_priority = ", ".join(f"{name} {count}" for name, count in scheduler_stats['queued_by_priority'].items())
+        embed.add_field(
+            name="Discord Actions",
+            value=(f"{scheduler_stats['queued']} queued ({queued_by_priority}), {scheduler_stats['in_flight']} in flight\n"
+                   f"{scheduler_stats['completed']} done, {scheduler_stats['failed']} failed, "
+                   f"{scheduler_stats['retries']} retries, avg latency {scheduler_stats['average_latency_ms']:.0f}ms"),
+            inline=False
+        )
+        
+        admission_stats = self.admissions.get_stats()
+        embed.add_field(
+            name="Onboarding Queue",
+            value=(f"{admission_stats['queued']}/{admission_stats['maxsize']} waiting, {admission_stats['running']} running\n"
+                   f"{admission_stats['processed']} handled, {admission_stats['coalesced']} coalesced, "
+                   f"{admission_stats['dropped']} dropped, {admission_stats['failed']} failed\n"
+                   f"Wait: avg {admission_stats['average_wait_ms']:.0f}ms, max {admission_stats['max_wait_ms']:.0f}ms"),
+            inline=False
+        )
+        
+        cache_stats = self.db.get_cache_stats()
+        user_cache = cache_stats['users']
+        embed.add_field(
+            name="User Cache",
+            value=(f"{user_cache['size']}/{user_cache['maxsize']} entries, "
+                   f"{user_cache['hits']} hits / {user_cache['misses']} misses "
+                   f"({user_cache['hit_rate']:.0%}), {user_cache['evictions']} evictions"),
+            inline=False
+        )
+        
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
+    @app_commands.command(name="export_data", description="Export users or screening sessions (Admin only)")
+    @app_commands.default_permissions(administrator=True)
+    async def export_data(self, interaction: discord.Interaction,
+                          dataset: Literal['users', 'sessions'] = 'users',
+                          file_format: Literal['csv', 'jsonl'] = 'csv'):
+        """Stream an export to a temporary file and attach it"""
+        await interaction.response.defer(ephemeral=True)
+        
+        filename = f"rusk_{dataset}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{file_format}"
+        path = os.path.join(tempfile.gettempdir(), filename)
+        try:
+            count = await self.db.export_to_path(dataset, path, file_format)
+        except Exception as e:
+            logger.error(f"Failed to export {dataset}: {e}")
+            await interaction.followup.send(f"❌ Failed to export {dataset}: {str(e)}", ephemeral=True)
+            return
+        
+        try:
+            await interaction.followup.send(f"📦 Exported {count} {dataset}.", file=discord.File(path), ephemeral=True)
+            os.remove(path)
+        except discord.HTTPException as e:
+            # Most likely over the attachment size limit - leave the file on disk
+            logger.warning(f"Could not attach export {path}: {e}")
+            await interaction.followup.send(f"📦 Exported {count} {dataset} to `{path}` on the bot host (too large to attach).", ephemeral=True)
+    
     @app_commands.command(name="start_screening", description="Start the onboarding screening via DM")
     async def start_screening(self, interaction: discord.Interaction):
         """Lets a user manually start the screening if they didn't receive a DM on join"""
         member = interaction.user
+        # The DM may wait on the scheduler for longer than an interaction may go unanswered
+        await interaction.response.defer(ephemeral=True)
         dm_ok = await self.start_screening_flow(member, "MANUAL_START")
         if dm_ok:
-            await interaction.response.send_message("📩 Check your DMs for the screening questions!", ephemeral=True)
+            await interaction.followup.send("📩 Check your DMs for the screening questions!", ephemeral=True)
         else:
-            await interaction.response.send_message("❗ I couldn't DM you. Please enable DMs for this server and run /start_screening again.", ephemeral=True)
+            await interaction.followup.send("❗ I couldn't DM you. Please enable DMs for this server and run /start_screening again.", ephemeral=True)
     
     @app_commands.command(name="fix_permissions", description="Fix channel permissions (Admin only)")
     async def fix_permissions(self, interaction: discord.Interaction):
@@ -628,6 +1253,163 @@ class RuskMediaBot(commands.Bot):
             logger.error(f"Failed to fix permissions: {e}")
             await interaction.followup.send(f"❌ Failed to fix permissions: {str(e)}", ephemeral=True)
 
+    @app_commands.command(name="merge_duplicates", description="Report or merge duplicate cohort roles and channels (Admin only)")
+    @app_commands.default_permissions(administrator=True)
+    @app_commands.describe(merge="Merge duplicates instead of only reporting them")
+    async def merge_duplicates(self, interaction: discord.Interaction, merge: bool = False):
+        """Find duplicate cohort roles and channels, optionally merging them"""
+        await interaction.response.defer(ephemeral=True)
+        
+        try:
+            report = await self.sweep_duplicates(interaction.guild, merge=merge)
+        except Exception as e:
+            logger.error(f"Failed to sweep duplicates: {e}")
+            await interaction.followup.send(f"❌ Failed to check for duplicates: {str(e)}", ephemeral=True)
+            return
+        
+        if not report['roles'] and not report['channels']:
+            await interaction.followup.send("✅ No duplicate roles or channels found.", ephemeral=True)
+            return
+        
+        lines = [f"Duplicate roles: {', '.join(report['roles']) or 'none'}",
+                 f"Duplicate channels: {', '.join(report['channels']) or 'none'}"]
+        if merge:
+            lines.append(f"Merged {report['merged_roles']} roles, deleted {report['deleted_channels']} empty channels "
+                         f"(only ones the bot created are merged)")
+            if report['kept_channels']:
+                lines.append(f"Kept (have messages): {', '.join(report['kept_channels'])}")
+        else:
+            lines.append("Run again with merge=True to merge them.")
+        await interaction.followup.send("\n".join(lines)[:2000], ephemeral=True)
+
+class ScreeningAnswerSelect(discord.ui.DynamicItem[discord.ui.Select],
+                            template=r'screening:(?P<question_key>\w+):(?P<user_id>\d+)'):
+    """Answer select of a question DM. The question and user are carried in the
+    custom_id, so one registration handles every question DM ever sent."""
+    def __init__(self, select: discord.ui.Select, question_key: str, user_id: int):
+        super().__init__(select)
+        self.question_key = question_key
+        self.user_id = user_id
+
+    @classmethod
+    def for_question(cls, bot: RuskMediaBot, question_key: str, user_id: int) -> 'ScreeningAnswerSelect':
+        select = bot.build_question_select(question_key, custom_id=f"screening:{question_key}:{user_id}")
+        return cls(select, question_key, user_id)
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Select, match: re.Match):
+        return cls(item, match['question_key'], int(match['user_id']))
+
+    async def callback(self, interaction: discord.Interaction):
+        bot = interaction.client
+        if interaction.user.id != self.user_id or self.question_key not in bot.screening_logic.questions:
+            await interaction.response.send_message("❗ This screening question isn't yours to answer.", ephemeral=True)
+            return
+        member = await bot.resolve_member(interaction.user)
+        if member is None:
+            await interaction.response.send_message("❗ I couldn't find you in the server. Please rejoin to restart.", ephemeral=True)
+            return
+        await bot.handle_screening_answer_dm(interaction, self.question_key, member)
+
+class ScreeningFormSelect(discord.ui.DynamicItem[discord.ui.Select],
+                          template=r'screening-form:(?P<question_key>\w+):(?P<user_id>\d+)'):
+    """One question's select on a single-message screening form"""
+    def __init__(self, select: discord.ui.Select, question_key: str, user_id: int):
+        super().__init__(select)
+        self.question_key = question_key
+        self.user_id = user_id
+
+    @classmethod
+    def for_question(cls, bot: RuskMediaBot, question_key: str, user_id: int, question: str,
+                     row: int, selected: Iterable[str] = ()) -> 'ScreeningFormSelect':
+        # Select placeholders are limited to 150 characters
+        placeholder = question if len(question) <= 150 else question[:147] + "..."
+        select = bot.build_question_select(question_key, custom_id=f"screening-form:{question_key}:{user_id}",
+                                           placeholder=placeholder, row=row)
+        selected = set(selected)
+        if selected:
+            # Copies, so the shared cached options are never marked
+            select.options = [discord.SelectOption(label=option.label, value=option.value,
+                                                   default=option.value in selected)
+                              for option in select.options]
+        return cls(select, question_key, user_id)
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Select, match: re.Match):
+        return cls(item, match['question_key'], int(match['user_id']))
+
+    async def callback(self, interaction: discord.Interaction):
+        bot = interaction.client
+        if interaction.user.id != self.user_id or self.question_key not in bot.screening_logic.questions:
+            await interaction.response.send_message("❗ This screening form isn't yours to answer.", ephemeral=True)
+            return
+        await bot.handle_screening_form_answer(interaction, self.question_key, self.user_id)
+
+class ScreeningFormSubmit(discord.ui.DynamicItem[discord.ui.Button],
+                          template=r'screening-form-submit:(?P<user_id>\d+)'):
+    """Submit button of a single-message screening form"""
+    def __init__(self, button: discord.ui.Button, user_id: int):
+        super().__init__(button)
+        self.user_id = user_id
+
+    @classmethod
+    def for_user(cls, user_id: int, row: int) -> 'ScreeningFormSubmit':
+        button = discord.ui.Button(label="Submit", style=discord.ButtonStyle.success,
+                                   custom_id=f"screening-form-submit:{user_id}", row=row)
+        return cls(button, user_id)
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match: re.Match):
+        return cls(item, int(match['user_id']))
+
+    async def callback(self, interaction: discord.Interaction):
+        bot = interaction.client
+        if interaction.user.id != self.user_id:
+            await interaction.response.send_message("❗ This screening form isn't yours to submit.", ephemeral=True)
+            return
+        member = await bot.resolve_member(interaction.user)
+        if member is None:
+            await interaction.response.send_message("❗ I couldn't find you in the server. Please rejoin to restart.", ephemeral=True)
+            return
+        await bot.handle_screening_form_submit(interaction, member)
+
+class ScreeningQuestionView(discord.ui.View):
+    """Persistent view for question DMs sent with the older per-question
+    custom_ids (screening_<question>), which carry no user id."""
+    def __init__(self, bot: RuskMediaBot):
+        super().__init__(timeout=None)
+        self.bot_ref = bot
+        for question_key in bot.screening_logic.questions:
+            select = bot.build_question_select(question_key)
+            select.callback = self.make_callback(question_key)
+            self.add_item(select)
+
+    def make_callback(self, question_key: str):
+        async def callback(interaction: discord.Interaction):
+            member = await self.bot_ref.resolve_member(interaction.user)
+            if member is None:
+                await interaction.response.send_message("❗ I couldn't find you in the server. Please rejoin to restart.", ephemeral=True)
+                return
+            await self.bot_ref.handle_screening_answer_dm(interaction, question_key, member)
+        return callback
+
+class StartScreeningView(discord.ui.View):
+    """View with a button that retries starting the screening via DM."""
+    def __init__(self, bot: RuskMediaBot):
+        super().__init__(timeout=300)
+        self.bot_ref = bot
+
+    @discord.ui.button(label="Start Screening", style=discord.ButtonStyle.primary)
+    async def start(self, interaction: discord.Interaction, button: discord.ui.Button):
+        member = interaction.user
+        # The DM may wait on the scheduler for longer than an interaction may go unanswered
+        await interaction.response.defer(ephemeral=True)
+        dm_ok = await self.bot_ref.start_screening_flow(member, "BUTTON_START")
+        if dm_ok:
+            await interaction.followup.send("📩 Sent! Please check your DMs to begin.", ephemeral=True)
+        else:
+            await interaction.followup.send("❗ I couldn't DM you. Enable DMs for this server and press the button again.", ephemeral=True)
+
 # Bot instance
 bot = RuskMediaBot()
 
@@ -645,19 +1427,3 @@ if __name__ == "__main__":
     
     logger.info("Starting Discord bot...")
     bot.run(DISCORD_TOKEN)
-
-
-class StartScreeningView(discord.ui.View):
-    """View with a button that retries starting the screening via DM."""
-    def __init__(self, bot: RuskMediaBot):
-        super().__init__(timeout=300)
-        self.bot_ref = bot
-
-    @discord.ui.button(label="Start Screening", style=discord.ButtonStyle.primary)
-    async def start(self, interaction: discord.Interaction, button: discord.ui.Button):
-        member = interaction.user
-        dm_ok = await self.bot_ref.start_screening_flow(member, "BUTTON_START")
-        if dm_ok:
-            await interaction.response.send_message("📩 Sent! Please check your DMs to begin.", ephemeral=True)
-        else:
-            await interaction.response.send_message("❗ I couldn't DM you. Enable DMs for this server and press the button again.", ephemeral=True)
@@ -0,0 +1,78 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Hashable, Optional
+
+MISSING = object()
+
+class LRUCache:
+    """Bounded least-recently-used cache with a per-entry time to live.
+    
+    Writers call invalidate() after changing the source of truth. Readers that
+    load a value take a generation token before the load and pass it to put(),
+    so a value read before an invalidation is never cached after it.
+    """
+    
+    def __init__(self, maxsize: int = 10000, ttl: Optional[float] = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, key: Hashable) -> Any:
+        """Get a cached value, or MISSING if absent or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISSING
+            
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return MISSING
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def put(self, key: Hashable, value: Any, generation: Optional[int] = None):
+        """Cache a value. Skipped if generation is given and an invalidation happened since"""
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def invalidate(self, key: Hashable):
+        """Drop a cached value"""
+        with self._lock:
+            self.generation += 1
+            self._entries.pop(key, None)
+    
+    def clear(self):
+        """Drop every cached value"""
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+    
+    def get_stats(self) -> Dict:
+        """Get size and hit/miss counters"""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
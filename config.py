@@ -9,6 +9,24 @@ GUILD_ID = int(os.getenv('GUILD_ID', 0))
 
 # Database Configuration
 DATABASE_PATH = 'rusk_media_bot.db'
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'sqlite')  # 'sqlite' or 'memory'
+DATABASE_READER_POOL_SIZE = int(os.getenv('DATABASE_READER_POOL_SIZE', 4))
+DATABASE_COMMIT_INTERVAL_MS = float(os.getenv('DATABASE_COMMIT_INTERVAL_MS', 5))
+DATABASE_MAX_BATCH_SIZE = int(os.getenv('DATABASE_MAX_BATCH_SIZE', 256))
+STATS_RECONCILE_INTERVAL_MINUTES = float(os.getenv('STATS_RECONCILE_INTERVAL_MINUTES', 360))
+SESSION_RETENTION_DAYS = float(os.getenv('SESSION_RETENTION_DAYS', 30))
+SESSION_RETENTION_BATCH_SIZE = int(os.getenv('SESSION_RETENTION_BATCH_SIZE', 500))
+SESSION_RETENTION_INTERVAL_MINUTES = float(os.getenv('SESSION_RETENTION_INTERVAL_MINUTES', 60))
+USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', 10000))
+USER_CACHE_TTL_SECONDS = float(os.getenv('USER_CACHE_TTL_SECONDS', 300))
+PERMISSION_AUDIT_CONCURRENCY = int(os.getenv('PERMISSION_AUDIT_CONCURRENCY', 4))
+DISCORD_SCHEDULER_WORKERS = int(os.getenv('DISCORD_SCHEDULER_WORKERS', 4))
+PREPROVISION_COHORTS = os.getenv('PREPROVISION_COHORTS', 'false').lower() in ('1', 'true', 'yes')
+PREPROVISION_INTERVAL_MINUTES = float(os.getenv('PREPROVISION_INTERVAL_MINUTES', 360))
+PREPROVISION_DELAY_SECONDS = float(os.getenv('PREPROVISION_DELAY_SECONDS', 2))
+ONBOARDING_WORKERS = int(os.getenv('ONBOARDING_WORKERS', 4))
+ONBOARDING_QUEUE_SIZE = int(os.getenv('ONBOARDING_QUEUE_SIZE', 1000))
+SCREENING_FORM_MODE = os.getenv('SCREENING_FORM_MODE', 'false').lower() in ('1', 'true', 'yes')
 
 # Campaign Configuration
 DEFAULT_CAMPAIGNS = [
@@ -1,79 +1,149 @@
 import sqlite3
 import json
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Iterable, Iterator, Set, Tuple
+
+from migrations import apply_migrations
 
 class DatabaseManager:
     def __init__(self, db_path: str = 'rusk_media_bot.db'):
         self.db_path = db_path
         self.init_database()
     
-    def init_database(self):
-        """Initialize the database with required tables"""
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Cursor]:
+        """Run the enclosed statements as one committed transaction"""
         conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Users table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                user_id INTEGER PRIMARY KEY,
-                username TEXT,
-                display_name TEXT,
-                phone_number TEXT,
-                campaign TEXT,
-                invite_link TEXT,
-                screening_completed BOOLEAN DEFAULT FALSE,
-                screening_data TEXT,  -- JSON string
-                roles_assigned TEXT,  -- JSON string
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Campaigns table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS campaigns (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT UNIQUE,
-                description TEXT,
-                invite_link TEXT,
-                is_active BOOLEAN DEFAULT TRUE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Screening sessions table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS screening_sessions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                campaign TEXT,
-                current_question TEXT,
-                answers TEXT,  -- JSON string
-                is_completed BOOLEAN DEFAULT FALSE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (user_id)
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
+        try:
+            yield conn.cursor()
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
     
-    def add_user(self, user_id: int, username: str, display_name: str, 
-                 campaign: str = None, invite_link: str = None) -> bool:
-        """Add a new user to the database"""
+    @contextmanager
+    def _query(self) -> Iterator[sqlite3.Cursor]:
+        """Provide a cursor for read-only statements"""
+        conn = sqlite3.connect(self.db_path)
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            yield conn.cursor()
+        finally:
+            conn.close()
+    
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Group writes into one unit. Every call here commits on its own connection,
+        so this is a no-op; persistent-connection subclasses override it.
+        """
+        yield
+    
+    def close(self):
+        """Nothing to release: connections are closed after every call"""
+    
+    @staticmethod
+    def _decode_user_row(user_data: Dict) -> Dict:
+        """Parse the JSON fields of a users row in place"""
+        if user_data['screening_data']:
+            user_data['screening_data'] = json.loads(user_data['screening_data'])
+        if user_data['roles_assigned']:
+            user_data['roles_assigned'] = json.loads(user_data['roles_assigned'])
+        return user_data
+    
+    @staticmethod
+    def _user_answer_rows(user_id: int, screening_data: Dict) -> List[Tuple[int, str, str]]:
+        """Flatten screening answers into (user_id, question, value) rows"""
+        return [(user_id, question, str(value))
+                for question, values in screening_data.items()
+                for value in (values if isinstance(values, list) else [values])
+                if value is not None]
+    
+    def _prepare_file(self):
+        """Apply file-level settings that cannot change inside a transaction"""
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        try:
+            enable_incremental_vacuum(conn)
+        finally:
+            conn.close()
+    
+    def init_database(self):
+        """Initialize the database with required tables and run pending migrations"""
+        self._prepare_file()
+        with self._transaction() as cursor:
+            # Users table
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS users (
+                    user_id INTEGER PRIMARY KEY,
+                    username TEXT,
+                    display_name TEXT,
+                    phone_number TEXT,
+                    campaign TEXT,
+                    invite_link TEXT,
+                    screening_completed BOOLEAN DEFAULT FALSE,
+                    screening_data TEXT,  -- JSON string
+                    roles_assigned TEXT,  -- JSON string
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
             
+            # Campaigns table
             cursor.execute('''
-                INSERT OR REPLACE INTO users 
-                (user_id, username, display_name, campaign, invite_link, updated_at)
-                VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-            ''', (user_id, username, display_name, campaign, invite_link))
+                CREATE TABLE IF NOT EXISTS campaigns (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name TEXT UNIQUE,
+                    description TEXT,
+                    invite_link TEXT,
+                    is_active BOOLEAN DEFAULT TRUE,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
             
-            conn.commit()
-            conn.close()
+            # Screening sessions table
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS screening_sessions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER,
+                    campaign TEXT,
+                    current_question TEXT,
+                    answers TEXT,  -- JSON string
+                    is_completed BOOLEAN DEFAULT FALSE,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (user_id) REFERENCES users (user_id)
+                )
+            ''')
+            
+            # Indexes and later schema changes
+            apply_migrations(cursor)
+    
+    def add_user(self, user_id: int, username: str, display_name: str,
+                 campaign: str = None, invite_link: str = None) -> bool:
+        """Add a new user to the database"""
+        try:
+            with self._transaction() as cursor:
+                # Upsert rather than INSERT OR REPLACE: REPLACE deletes the old row
+                # without firing the delete trigger that keeps stats_counters right
+                cursor.execute('''
+                    INSERT INTO users
+                    (user_id, username, display_name, campaign, invite_link, updated_at)
+                    VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                    ON CONFLICT (user_id) DO UPDATE SET
+                        username = excluded.username,
+                        display_name = excluded.display_name,
+                        phone_number = NULL,
+                        campaign = excluded.campaign,
+                        invite_link = excluded.invite_link,
+                        screening_completed = FALSE,
+                        screening_data = NULL,
+                        roles_assigned = NULL,
+                        created_at = CURRENT_TIMESTAMP,
+                        updated_at = CURRENT_TIMESTAMP
+                ''', (user_id, username, display_name, campaign, invite_link))
+                
+                # The row is replaced with empty screening data, so drop its answers too
+                cursor.execute('DELETE FROM user_answers WHERE user_id = ?', (user_id,))
             return True
         except Exception as e:
             print(f"Error adding user: {e}")
@@ -82,27 +152,18 @@ class DatabaseManager:
     def get_user(self, user_id: int) -> Optional[Dict]:
         """Get user information"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('SELECT * FROM users WHERE user_id = ?', (user_id,))
-            row = cursor.fetchone()
-            
-            if row:
-                columns = [description[0] for description in cursor.description]
-                user_data = dict(zip(columns, row))
+            with self._query() as cursor:
+                cursor.execute('SELECT * FROM users WHERE user_id = ?', (user_id,))
+                row = cursor.fetchone()
                 
-                # Parse JSON fields
-                if user_data['screening_data']:
-                    user_data['screening_data'] = json.loads(user_data['screening_data'])
-                if user_data['roles_assigned']:
-                    user_data['roles_assigned'] = json.loads(user_data['roles_assigned'])
+                if not row:
+                    return None
                 
-                conn.close()
-                return user_data
+                columns = [description[0] for description in cursor.description]
+                user_data = dict(zip(columns, row))
             
-            conn.close()
-            return None
+            # Parse JSON fields
+            return self._decode_user_row(user_data)
         except Exception as e:
             print(f"Error getting user: {e}")
             return None
@@ -110,37 +171,40 @@ class DatabaseManager:
     def remove_user(self, user_id: int) -> bool:
         """Remove user and all their data from the database"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Remove from users table
-            cursor.execute('DELETE FROM users WHERE user_id = ?', (user_id,))
-            
-            # Remove from screening_sessions table
-            cursor.execute('DELETE FROM screening_sessions WHERE user_id = ?', (user_id,))
-            
-            conn.commit()
-            conn.close()
+            with self._transaction() as cursor:
+                # Remove from users table
+                cursor.execute('DELETE FROM users WHERE user_id = ?', (user_id,))
+                
+                # Remove from screening_sessions table
+                cursor.execute('DELETE FROM screening_sessions WHERE user_id = ?', (user_id,))
+                
+                # Remove normalized answers
+                cursor.execute('DELETE FROM user_answers WHERE user_id = ?', (user_id,))
             return True
         except Exception as e:
             print(f"Error removing user: {e}")
             return False
     
-    def update_user_screening(self, user_id: int, screening_data: Dict, 
+    def update_user_screening(self, user_id: int, screening_data: Dict,
                             roles_assigned: List[str]) -> bool:
         """Update user's screening data and roles"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                UPDATE users 
-                SET screening_data = ?, roles_assigned = ?, screening_completed = TRUE, updated_at = CURRENT_TIMESTAMP
-                WHERE user_id = ?
-            ''', (json.dumps(screening_data), json.dumps(roles_assigned), user_id))
-            
-            conn.commit()
-            conn.close()
+            with self._transaction() as cursor:
+                cursor.execute('''
+                    UPDATE users
+                    SET screening_data = ?, roles_assigned = ?, screening_completed = TRUE, updated_at = CURRENT_TIMESTAMP
+                    WHERE user_id = ?
+                ''', (json.dumps(screening_data), json.dumps(roles_assigned), user_id))
+                if cursor.rowcount == 0:
+                    # Unknown user, as with the in-memory backend: store no orphaned answers
+                    return True
+                
+                # Keep one user_answers row per selected value for SQL-side segmentation
+                cursor.execute('DELETE FROM user_answers WHERE user_id = ?', (user_id,))
+                cursor.executemany('''
+                    INSERT OR IGNORE INTO user_answers (user_id, question, value)
+                    VALUES (?, ?, ?)
+                ''', self._user_answer_rows(user_id, screening_data))
             return True
         except Exception as e:
             print(f"Error updating user screening: {e}")
@@ -149,17 +213,13 @@ class DatabaseManager:
     def start_screening_session(self, user_id: int, campaign: str) -> int:
         """Start a new screening session"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO screening_sessions (user_id, campaign, current_question, answers)
-                VALUES (?, ?, 'show_types', '{}')
-            ''', (user_id, campaign))
-            
-            session_id = cursor.lastrowid
-            conn.commit()
-            conn.close()
+            with self._transaction() as cursor:
+                cursor.execute('''
+                    INSERT INTO screening_sessions (user_id, campaign, current_question, answers)
+                    VALUES (?, ?, 'show_types', '{}')
+                ''', (user_id, campaign))
+                
+                session_id = cursor.lastrowid
             return session_id
         except Exception as e:
             print(f"Error starting screening session: {e}")
@@ -168,65 +228,81 @@ class DatabaseManager:
     def update_screening_session(self, user_id: int, question: str, answer: Any) -> bool:
         """Update screening session with new answer"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Get current answers
-            cursor.execute('''
-                SELECT answers FROM screening_sessions 
-                WHERE user_id = ? AND is_completed = FALSE
-                ORDER BY created_at DESC LIMIT 1
-            ''', (user_id,))
-            
-            row = cursor.fetchone()
-            if row:
-                answers = json.loads(row[0]) if row[0] else {}
-                answers[question] = answer
-                
+            with self._transaction() as cursor:
+                # Set the single answer in place so concurrent answers never overwrite each other
                 cursor.execute('''
-                    UPDATE screening_sessions 
-                    SET answers = ?, current_question = ?
-                    WHERE user_id = ? AND is_completed = FALSE
-                ''', (json.dumps(answers), question, user_id))
-                
-                conn.commit()
-                conn.close()
-                return True
-            
-            conn.close()
-            return False
+                    UPDATE screening_sessions
+                    SET answers = json_set(COALESCE(answers, '{}'), '$."' || ? || '"', json(?)),
+                        current_question = ?
+                    WHERE id = (
+                        SELECT id FROM screening_sessions
+                        WHERE user_id = ? AND is_completed = FALSE
+                        ORDER BY created_at DESC, id DESC LIMIT 1
+                    )
+                ''', (question, json.dumps(answer), question, user_id))
+                updated = cursor.rowcount > 0
+            return updated
         except Exception as e:
             print(f"Error updating screening session: {e}")
             return False
     
-    def complete_screening_session(self, user_id: int) -> Optional[Dict]:
-        """Complete screening session and return final answers"""
+    def get_open_screening_session(self, user_id: int) -> Optional[Dict]:
+        """Get the user's latest unfinished screening session, used to restore in-flight
+        screenings after a restart. Ignored once the user is marked as screened.
+        """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT answers FROM screening_sessions 
-                WHERE user_id = ? AND is_completed = FALSE
-                ORDER BY created_at DESC LIMIT 1
-            ''', (user_id,))
-            
-            row = cursor.fetchone()
-            if row:
-                answers = json.loads(row[0]) if row[0] else {}
+            with self._query() as cursor:
+                cursor.execute('''
+                    SELECT s.id, s.campaign, s.current_question, s.answers
+                    FROM screening_sessions s
+                    WHERE s.user_id = ? AND s.is_completed = FALSE
+                      AND NOT EXISTS (
+                          SELECT 1 FROM users u
+                          WHERE u.user_id = s.user_id AND u.screening_completed
+                      )
+                    ORDER BY s.created_at DESC, s.id DESC LIMIT 1
+                ''', (user_id,))
+                row = cursor.fetchone()
+            if not row:
+                return None
+            return {
+                'session_id': row[0],
+                'campaign': row[1],
+                'current_question': row[2],
+                'answers': json.loads(row[3]) if row[3] else {}
+            }
+        except Exception as e:
+            print(f"Error getting open screening session: {e}")
+            return None
+    
+    def complete_screening_session(self, user_id: int, answers: Optional[Dict] = None) -> Optional[Dict]:
+        """Complete screening session and return final answers. Answers given here
+        replace the stored ones, so a whole form is recorded in the same write."""
+        try:
+            with self._transaction() as cursor:
+                cursor.execute('''
+                    SELECT id, answers FROM screening_sessions
+                    WHERE user_id = ? AND is_completed = FALSE
+                    ORDER BY created_at DESC, id DESC LIMIT 1
+                ''', (user_id,))
+                
+                row = cursor.fetchone()
+                if not row:
+                    return None
+                
+                if answers is None:
+                    answers = json.loads(row[1]) if row[1] else {}
+                else:
+                    cursor.execute('''
+                        UPDATE screening_sessions SET answers = ? WHERE id = ?
+                    ''', (json.dumps(answers), row[0]))
                 
                 cursor.execute('''
-                    UPDATE screening_sessions 
+                    UPDATE screening_sessions
                     SET is_completed = TRUE
                     WHERE user_id = ? AND is_completed = FALSE
                 ''', (user_id,))
-                
-                conn.commit()
-                conn.close()
-                return answers
-            
-            conn.close()
-            return None
+            return answers
         except Exception as e:
             print(f"Error completing screening session: {e}")
             return None
@@ -234,16 +310,11 @@ class DatabaseManager:
     def add_campaign(self, name: str, description: str, invite_link: str) -> bool:
         """Add a new campaign"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT OR REPLACE INTO campaigns (name, description, invite_link)
-                VALUES (?, ?, ?)
-            ''', (name, description, invite_link))
-            
-            conn.commit()
-            conn.close()
+            with self._transaction() as cursor:
+                cursor.execute('''
+                    INSERT OR REPLACE INTO campaigns (name, description, invite_link)
+                    VALUES (?, ?, ?)
+                ''', (name, description, invite_link))
             return True
         except Exception as e:
             print(f"Error adding campaign: {e}")
@@ -252,51 +323,349 @@ class DatabaseManager:
     def get_campaigns(self) -> List[Dict]:
         """Get all campaigns"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('SELECT * FROM campaigns WHERE is_active = TRUE')
-            rows = cursor.fetchall()
-            
-            columns = [description[0] for description in cursor.description]
-            campaigns = [dict(zip(columns, row)) for row in rows]
-            
-            conn.close()
+            with self._query() as cursor:
+                cursor.execute('SELECT * FROM campaigns WHERE is_active = TRUE')
+                rows = cursor.fetchall()
+                
+                columns = [description[0] for description in cursor.description]
+                campaigns = [dict(zip(columns, row)) for row in rows]
             return campaigns
         except Exception as e:
             print(f"Error getting campaigns: {e}")
             return []
     
     def get_user_stats(self) -> Dict:
-        """Get user statistics"""
+        """Get user statistics from the trigger-maintained counters"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Total users
-            cursor.execute('SELECT COUNT(*) FROM users')
-            total_users = cursor.fetchone()[0]
-            
-            # Completed screenings
-            cursor.execute('SELECT COUNT(*) FROM users WHERE screening_completed = TRUE')
-            completed_screenings = cursor.fetchone()[0]
-            
-            # Users by campaign
-            cursor.execute('''
-                SELECT campaign, COUNT(*) as count 
-                FROM users 
-                WHERE campaign IS NOT NULL 
-                GROUP BY campaign
-            ''')
-            campaign_stats = dict(cursor.fetchall())
+            with self._query() as cursor:
+                cursor.execute('SELECT name, value FROM stats_counters')
+                counters = dict(cursor.fetchall())
+                
+                # Users by campaign
+                cursor.execute('SELECT campaign, user_count FROM campaign_user_counts WHERE user_count > 0')
+                campaign_stats = dict(cursor.fetchall())
             
-            conn.close()
             return {
-                'total_users': total_users,
-                'completed_screenings': completed_screenings,
+                'total_users': counters.get('total_users', 0),
+                'completed_screenings': counters.get('completed_screenings', 0),
                 'campaign_stats': campaign_stats
             }
         except Exception as e:
             print(f"Error getting user stats: {e}")
             return {}
+    
+    def reconcile_stats(self) -> Dict:
+        """Recompute the statistics counters from the users table.
+        Returns the drift that was corrected as {counter: actual - stored},
+        with per-campaign drift under 'campaign_stats'. Empty if the counters were right.
+        """
+        try:
+            with self._transaction() as cursor:
+                cursor.execute('SELECT name, value FROM stats_counters')
+                stored = dict(cursor.fetchall())
+                cursor.execute('SELECT campaign, user_count FROM campaign_user_counts')
+                stored_campaigns = dict(cursor.fetchall())
+                
+                cursor.execute('SELECT COUNT(*) FROM users')
+                total_users = cursor.fetchone()[0]
+                cursor.execute('SELECT COUNT(*) FROM users WHERE screening_completed = TRUE')
+                completed_screenings = cursor.fetchone()[0]
+                cursor.execute('''
+                    SELECT campaign, COUNT(*) FROM users
+                    WHERE campaign IS NOT NULL
+                    GROUP BY campaign
+                ''')
+                actual_campaigns = dict(cursor.fetchall())
+                
+                drift = {}
+                for name, actual in (('total_users', total_users),
+                                     ('completed_screenings', completed_screenings)):
+                    if stored.get(name, 0) != actual:
+                        drift[name] = actual - stored.get(name, 0)
+                
+                campaign_drift = {}
+                for campaign in set(stored_campaigns) | set(actual_campaigns):
+                    delta = actual_campaigns.get(campaign, 0) - stored_campaigns.get(campaign, 0)
+                    if delta:
+                        campaign_drift[campaign] = delta
+                if campaign_drift:
+                    drift['campaign_stats'] = campaign_drift
+                
+                if drift:
+                    cursor.executemany('INSERT OR REPLACE INTO stats_counters (name, value) VALUES (?, ?)',
+                                       [('total_users', total_users),
+                                        ('completed_screenings', completed_screenings)])
+                    cursor.execute('DELETE FROM campaign_user_counts')
+                    cursor.executemany('INSERT INTO campaign_user_counts (campaign, user_count) VALUES (?, ?)',
+                                       list(actual_campaigns.items()))
+            return drift
+        except Exception as e:
+            print(f"Error reconciling stats: {e}")
+            return {}
+    
+    def archive_screening_sessions(self, max_age_days: float, batch_size: int = 500) -> int:
+        """Move one batch of sessions older than max_age_days into the daily summary
+        table and delete them. Completed sessions are counted as 'completed', ones
+        still open at that age as 'abandoned'. Returns how many were archived;
+        call repeatedly until it returns less than batch_size.
+        """
+        try:
+            with self._transaction() as cursor:
+                # Pick the batch once, so the rows counted are exactly the rows deleted
+                cursor.execute('CREATE TEMP TABLE IF NOT EXISTS archive_batch (id INTEGER PRIMARY KEY)')
+                cursor.execute('DELETE FROM temp.archive_batch')
+                cursor.execute('''
+                    INSERT INTO temp.archive_batch (id)
+                    SELECT id FROM screening_sessions
+                    WHERE created_at < datetime('now', ?)
+                    ORDER BY created_at, id LIMIT ?
+                ''', (f'-{max_age_days} days', batch_size))
+                
+                cursor.execute('''
+                    INSERT INTO screening_session_archive (day, campaign, outcome, session_count)
+                    SELECT date(created_at), COALESCE(campaign, ''),
+                           CASE WHEN is_completed THEN 'completed' ELSE 'abandoned' END,
+                           COUNT(*)
+                    FROM screening_sessions
+                    WHERE id IN (SELECT id FROM temp.archive_batch)
+                    GROUP BY 1, 2, 3
+                    ON CONFLICT (day, campaign, outcome)
+                    DO UPDATE SET session_count = session_count + excluded.session_count
+                ''')
+                
+                cursor.execute('DELETE FROM screening_sessions WHERE id IN (SELECT id FROM temp.archive_batch)')
+                archived = cursor.rowcount
+                cursor.execute('DELETE FROM temp.archive_batch')
+            return archived
+        except Exception as e:
+            print(f"Error archiving screening sessions: {e}")
+            return 0
+    
+    def reclaim_free_pages(self, max_pages: int = 1000) -> int:
+        """Return up to max_pages free pages to the filesystem. Returns pages freed."""
+        try:
+            with self._transaction() as cursor:
+                cursor.execute('PRAGMA freelist_count')
+                free_before = cursor.fetchone()[0]
+                # sqlite3 only steps a statement that returns no rows once, and each
+                # step of incremental_vacuum frees a single page
+                for _ in range(min(free_before, max_pages)):
+                    cursor.execute('PRAGMA incremental_vacuum(1)')
+                cursor.execute('PRAGMA freelist_count')
+                freed = free_before - cursor.fetchone()[0]
+            return freed
+        except Exception as e:
+            print(f"Error reclaiming free pages: {e}")
+            return 0
+    
+    def add_managed_object(self, guild_id: int, object_id: int, kind: str) -> bool:
+        """Record a role, channel or category the bot created"""
+        try:
+            with self._transaction() as cursor:
+                cursor.execute(
+                    'INSERT OR IGNORE INTO managed_objects (object_id, guild_id, kind) VALUES (?, ?, ?)',
+                    (object_id, guild_id, kind))
+            return True
+        except Exception as e:
+            print(f"Error recording managed object: {e}")
+            return False
+    
+    def get_managed_objects(self, guild_id: int) -> Set[int]:
+        """Get the ids of every role, channel and category the bot created in a guild"""
+        try:
+            with self._query() as cursor:
+                cursor.execute('SELECT object_id FROM managed_objects WHERE guild_id = ?', (guild_id,))
+                return {row[0] for row in cursor.fetchall()}
+        except Exception as e:
+            print(f"Error getting managed objects: {e}")
+            return set()
+    
+    def iter_users(self, batch_size: int = 500) -> Iterator[Dict]:
+        """Stream every user, fetching batch_size rows at a time so memory stays constant"""
+        with self._query() as cursor:
+            cursor.execute('SELECT * FROM users ORDER BY user_id')
+            columns = [description[0] for description in cursor.description]
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield self._decode_user_row(dict(zip(columns, row)))
+    
+    def iter_screening_sessions(self, batch_size: int = 500) -> Iterator[Dict]:
+        """Stream every screening session, fetching batch_size rows at a time"""
+        with self._query() as cursor:
+            cursor.execute('SELECT * FROM screening_sessions ORDER BY id')
+            columns = [description[0] for description in cursor.description]
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    session = dict(zip(columns, row))
+                    session['answers'] = json.loads(session['answers']) if session['answers'] else {}
+                    yield session
+    
+    def import_users(self, users: Iterable[Dict], batch_size: int = 5000) -> int:
+        """Bulk insert or overwrite users, batch_size rows per transaction.
+        Accepts the records produced by iter_users. Returns the number imported.
+        """
+        imported = 0
+        try:
+            for chunk in _chunked(users, batch_size):
+                with self._transaction() as cursor:
+                    cursor.executemany('''
+                        INSERT INTO users
+                        (user_id, username, display_name, phone_number, campaign, invite_link,
+                         screening_completed, screening_data, roles_assigned, created_at, updated_at)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?,
+                                COALESCE(?, CURRENT_TIMESTAMP), COALESCE(?, CURRENT_TIMESTAMP))
+                        ON CONFLICT (user_id) DO UPDATE SET
+                            username = excluded.username,
+                            display_name = excluded.display_name,
+                            phone_number = excluded.phone_number,
+                            campaign = excluded.campaign,
+                            invite_link = excluded.invite_link,
+                            screening_completed = excluded.screening_completed,
+                            screening_data = excluded.screening_data,
+                            roles_assigned = excluded.roles_assigned,
+                            created_at = excluded.created_at,
+                            updated_at = excluded.updated_at
+                    ''', [(
+                        user['user_id'],
+                        user.get('username'),
+                        user.get('display_name'),
+                        user.get('phone_number'),
+                        user.get('campaign'),
+                        user.get('invite_link'),
+                        bool(user.get('screening_completed')),
+                        json.dumps(user['screening_data']) if user.get('screening_data') else None,
+                        json.dumps(user['roles_assigned']) if user.get('roles_assigned') else None,
+                        user.get('created_at'),
+                        user.get('updated_at')
+                    ) for user in chunk])
+                    
+                    cursor.executemany('DELETE FROM user_answers WHERE user_id = ?',
+                                       [(user['user_id'],) for user in chunk])
+                    cursor.executemany('''
+                        INSERT OR IGNORE INTO user_answers (user_id, question, value)
+                        VALUES (?, ?, ?)
+                    ''', [answer for user in chunk if user.get('screening_data')
+                          for answer in self._user_answer_rows(user['user_id'], user['screening_data'])])
+                imported += len(chunk)
+            return imported
+        except Exception as e:
+            print(f"Error importing users after {imported} rows: {e}")
+            return imported
+    
+    def import_screening_sessions(self, sessions: Iterable[Dict], batch_size: int = 5000) -> int:
+        """Bulk insert screening sessions, batch_size rows per transaction.
+        Session ids are reassigned so imports never collide with local rows.
+        """
+        imported = 0
+        try:
+            for chunk in _chunked(sessions, batch_size):
+                with self._transaction() as cursor:
+                    cursor.executemany('''
+                        INSERT INTO screening_sessions
+                        (user_id, campaign, current_question, answers, is_completed, created_at)
+                        VALUES (?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+                    ''', [(
+                        session['user_id'],
+                        session.get('campaign'),
+                        session.get('current_question'),
+                        json.dumps(session.get('answers') or {}),
+                        bool(session.get('is_completed')),
+                        session.get('created_at')
+                    ) for session in chunk])
+                imported += len(chunk)
+            return imported
+        except Exception as e:
+            print(f"Error importing screening sessions after {imported} rows: {e}")
+            return imported
+    
+    @staticmethod
+    def _cohort_filter_sql(filters: Dict[str, str]) -> Tuple[str, List[Any]]:
+        """Build a subquery selecting the user_ids that match every question=value filter"""
+        conditions = ' OR '.join(['(question = ? AND value = ?)'] * len(filters))
+        params = [item for pair in filters.items() for item in pair]
+        sql = f'''
+            SELECT user_id FROM user_answers
+            WHERE {conditions}
+            GROUP BY user_id
+            HAVING COUNT(*) = ?
+        '''
+        return sql, params + [len(filters)]
+    
+    def count_cohort(self, filters: Dict[str, str]) -> int:
+        """Count screened users matching every answer filter,
+        e.g. {'gender': 'female', 'age_group': '18_24', 'show_types': 'anime'}
+        """
+        try:
+            with self._query() as cursor:
+                if filters:
+                    cohort_sql, params = self._cohort_filter_sql(filters)
+                    cursor.execute(f'SELECT COUNT(*) FROM ({cohort_sql})', params)
+                else:
+                    cursor.execute('SELECT COUNT(DISTINCT user_id) FROM user_answers')
+                count = cursor.fetchone()[0]
+            return count
+        except Exception as e:
+            print(f"Error counting cohort: {e}")
+            return 0
+    
+    def get_segment_counts(self, group_by: List[str],
+                           filters: Optional[Dict[str, str]] = None) -> Dict[Tuple[str, ...], int]:
+        """Count screened users per combination of answers to the group_by questions.
+        Multi-select answers (show_types) count a user once per selected value.
+        Returns: {('female', 'tier2'): 12, ...} keyed in group_by order
+        """
+        if not group_by:
+            return {}
+        try:
+            select_columns = ', '.join(f'a{i}.value' for i in range(len(group_by)))
+            joins = ' '.join(
+                f'JOIN user_answers a{i} ON a{i}.user_id = a0.user_id AND a{i}.question = ?'
+                for i in range(1, len(group_by))
+            )
+            sql = f'''
+                SELECT {select_columns}, COUNT(*)
+                FROM user_answers a0 {joins}
+                WHERE a0.question = ?
+            '''
+            params = list(group_by[1:]) + [group_by[0]]
+            
+            if filters:
+                cohort_sql, cohort_params = self._cohort_filter_sql(filters)
+                sql += f' AND a0.user_id IN ({cohort_sql})'
+                params += cohort_params
+            
+            sql += f' GROUP BY {select_columns}'
+            
+            with self._query() as cursor:
+                cursor.execute(sql, params)
+                counts = {tuple(row[:-1]): row[-1] for row in cursor.fetchall()}
+            return counts
+        except Exception as e:
+            print(f"Error getting segment counts: {e}")
+            return {}
+
+def _chunked(items: Iterable, size: int) -> Iterator[List]:
+    """Split an iterable into lists of at most size items without materialising it"""
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
 
+def enable_incremental_vacuum(conn: sqlite3.Connection):
+    """Switch the file to incremental auto-vacuum so deleted pages can be given back.
+    Must run outside a transaction. Converting an existing file rewrites it once
+    with VACUUM; new files are switched before any table exists.
+    """
+    if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+        conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        conn.execute('VACUUM')
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Streaming export and bulk import of users and screening sessions.
+
+Exports read the database in fixed-size chunks and write each record as soon as
+it is read, so memory use stays constant however many users have joined.
+
+Usage:
+    python export_data.py export users --format csv --output users.csv
+    python export_data.py export sessions --format jsonl --output sessions.jsonl
+    python export_data.py import users --input users.jsonl
+"""
+
+import argparse
+import contextlib
+import csv
+import json
+import sys
+from typing import Dict, Iterator, TextIO
+
+from database import DatabaseManager
+from screening_logic import ScreeningLogic
+
+USER_CSV_FIELDS = [
+    'user_id', 'username', 'display_name', 'campaign', 'invite_link', 'screening_completed',
+    'gender', 'age_group', 'content_types', 'tier', 'roles_assigned', 'created_at', 'updated_at'
+]
+
+SESSION_CSV_FIELDS = [
+    'id', 'user_id', 'campaign', 'current_question', 'is_completed', 'created_at', 'answers'
+]
+
+def decode_user(user: Dict, screening_logic: ScreeningLogic) -> Dict:
+    """Attach the decoded screening segments to an exported user record"""
+    user['segments'] = screening_logic.get_user_segments(user['screening_data'] or {})
+    return user
+
+def user_csv_row(user: Dict) -> Dict:
+    """Flatten an exported user record into one CSV row"""
+    segments = user['segments']
+    return {
+        'user_id': user['user_id'],
+        'username': user['username'],
+        'display_name': user['display_name'],
+        'campaign': user['campaign'],
+        'invite_link': user['invite_link'],
+        'screening_completed': bool(user['screening_completed']),
+        'gender': segments['gender'],
+        'age_group': segments['age_group'],
+        'content_types': '|'.join(segments['content_types']),
+        'tier': segments['tier'],
+        'roles_assigned': '|'.join(user['roles_assigned'] or []),
+        'created_at': user['created_at'],
+        'updated_at': user['updated_at']
+    }
+
+def session_csv_row(session: Dict) -> Dict:
+    """Flatten an exported screening session into one CSV row"""
+    row = {field: session[field] for field in SESSION_CSV_FIELDS}
+    row['is_completed'] = bool(session['is_completed'])
+    row['answers'] = json.dumps(session['answers'])
+    return row
+
+def export_users(db: DatabaseManager, output: TextIO, file_format: str = 'csv',
+                 batch_size: int = 500) -> int:
+    """Write every user with decoded screening segments to output. Returns rows written."""
+    screening_logic = ScreeningLogic()
+    users = (decode_user(user, screening_logic) for user in db.iter_users(batch_size))
+    if file_format == 'csv':
+        return _write_csv(output, USER_CSV_FIELDS, (user_csv_row(user) for user in users))
+    return _write_jsonl(output, users)
+
+def export_sessions(db: DatabaseManager, output: TextIO, file_format: str = 'csv',
+                    batch_size: int = 500) -> int:
+    """Write every screening session to output. Returns rows written."""
+    sessions = db.iter_screening_sessions(batch_size)
+    if file_format == 'csv':
+        return _write_csv(output, SESSION_CSV_FIELDS, (session_csv_row(session) for session in sessions))
+    return _write_jsonl(output, sessions)
+
+def export_to_path(db: DatabaseManager, dataset: str, path: str, file_format: str = 'csv') -> int:
+    """Export 'users' or 'sessions' to a file. Returns rows written."""
+    export = export_users if dataset == 'users' else export_sessions
+    with open(path, 'w', newline='', encoding='utf-8') as output:
+        return export(db, output, file_format)
+
+def read_jsonl(source: TextIO) -> Iterator[Dict]:
+    """Lazily parse one JSON record per line"""
+    for line in source:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+def _write_csv(output: TextIO, fields, rows) -> int:
+    writer = csv.DictWriter(output, fieldnames=fields)
+    writer.writeheader()
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+def _write_jsonl(output: TextIO, records) -> int:
+    count = 0
+    for record in records:
+        output.write(json.dumps(record, default=str) + '\n')
+        count += 1
+    return count
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or import Rusk Media bot data")
+    parser.add_argument('action', choices=['export', 'import'])
+    parser.add_argument('dataset', choices=['users', 'sessions'])
+    parser.add_argument('--format', dest='file_format', choices=['csv', 'jsonl'], default='jsonl',
+                        help="Export format (imports always read JSONL)")
+    parser.add_argument('--output', default='-', help="Export destination, '-' for stdout")
+    parser.add_argument('--input', default='-', help="Import source, '-' for stdin")
+    parser.add_argument('--db', default=None, help="Database path (defaults to DATABASE_PATH)")
+    parser.add_argument('--batch-size', type=int, default=5000, help="Rows per import transaction")
+    args = parser.parse_args()
+    
+    if args.db is None:
+        from config import DATABASE_PATH
+        args.db = DATABASE_PATH
+    # Keep migration notices out of exports written to stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        db = DatabaseManager(args.db)
+    
+    if args.action == 'export':
+        if args.output == '-':
+            export = export_users if args.dataset == 'users' else export_sessions
+            count = export(db, sys.stdout, args.file_format)
+        else:
+            count = export_to_path(db, args.dataset, args.output, args.file_format)
+        print(f"Exported {count} {args.dataset}", file=sys.stderr)
+    else:
+        source = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+        with source:
+            if args.dataset == 'users':
+                count = db.import_users(read_jsonl(source), args.batch_size)
+            else:
+                count = db.import_screening_sessions(read_jsonl(source), args.batch_size)
+        print(f"Imported {count} {args.dataset}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
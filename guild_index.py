@@ -0,0 +1,131 @@
+from typing import Dict, List, Optional
+
+import discord
+
+class _GuildEntry:
+    """Roles and channels of one guild, grouped by name then id, plus the number
+    of channels in each category"""
+
+    def __init__(self, guild: discord.Guild):
+        self.roles: Dict[str, Dict[int, discord.Role]] = {}
+        self.channels: Dict[str, Dict[int, discord.abc.GuildChannel]] = {}
+        self.channel_parents: Dict[int, Optional[int]] = {}
+        self.category_sizes: Dict[int, int] = {}
+        for role in guild.roles:
+            self.roles.setdefault(role.name, {})[role.id] = role
+        for channel in guild.channels:
+            self.add_channel(channel)
+
+    def add_channel(self, channel: discord.abc.GuildChannel):
+        _add(self.channels, channel.name, channel)
+        self.remove_parent(channel.id)
+        category_id = getattr(channel, 'category_id', None)
+        self.channel_parents[channel.id] = category_id
+        if category_id is not None:
+            self.category_sizes[category_id] = self.category_sizes.get(category_id, 0) + 1
+
+    def remove_channel(self, name: str, channel_id: int):
+        _remove(self.channels, name, channel_id)
+        self.remove_parent(channel_id)
+
+    def remove_parent(self, channel_id: int):
+        category_id = self.channel_parents.pop(channel_id, None)
+        if category_id is not None:
+            self.category_sizes[category_id] -= 1
+
+def _add(index: Dict[str, Dict[int, object]], name: str, obj):
+    index.setdefault(name, {})[obj.id] = obj
+
+def _remove(index: Dict[str, Dict[int, object]], name: str, obj_id: int):
+    named = index.get(name)
+    if named is not None:
+        named.pop(obj_id, None)
+        if not named:
+            del index[name]
+
+def _first(named: Optional[Dict[int, object]]):
+    # Names are not unique in Discord; always resolve duplicates to the oldest object
+    return min(named.values(), key=lambda obj: obj.id) if named else None
+
+class GuildIndex:
+    """Name -> object lookups for the roles and channels of every guild.
+
+    Names are not unique in Discord, so lookups resolve duplicates to the oldest
+    object. Each guild is indexed from its cache on first use. The bot keeps the
+    index in sync from the on_guild_role_* and on_guild_channel_* events, and adds
+    objects it creates itself straight away so they are found before the event
+    arrives.
+    """
+
+    def __init__(self):
+        self._guilds: Dict[int, _GuildEntry] = {}
+
+    def _entry(self, guild: discord.Guild) -> _GuildEntry:
+        entry = self._guilds.get(guild.id)
+        if entry is None:
+            entry = self._guilds[guild.id] = _GuildEntry(guild)
+        return entry
+
+    def rebuild(self, guild: discord.Guild):
+        """Re-index a guild from its cache, e.g. after it becomes available again"""
+        self._guilds[guild.id] = _GuildEntry(guild)
+
+    def forget(self, guild: discord.Guild):
+        """Drop a guild the bot has left"""
+        self._guilds.pop(guild.id, None)
+
+    def get_role(self, guild: discord.Guild, name: str) -> Optional[discord.Role]:
+        """Get a role by name"""
+        return _first(self._entry(guild).roles.get(name))
+
+    def get_channel(self, guild: discord.Guild, name: str) -> Optional[discord.abc.GuildChannel]:
+        """Get a channel of any type by name"""
+        return _first(self._entry(guild).channels.get(name))
+
+    def get_text_channel(self, guild: discord.Guild, name: str) -> Optional[discord.TextChannel]:
+        """Get a text channel by name"""
+        named = self._entry(guild).channels.get(name) or {}
+        return _first({channel_id: channel for channel_id, channel in named.items()
+                       if isinstance(channel, discord.TextChannel)})
+
+    def category_size(self, category: discord.CategoryChannel) -> int:
+        """Number of channels in a category, counting ones the bot just created"""
+        return self._entry(category.guild).category_sizes.get(category.id, 0)
+
+    def duplicate_roles(self, guild: discord.Guild) -> Dict[str, List[discord.Role]]:
+        """Get every role name shared by more than one role, oldest role first"""
+        return {name: sorted(named.values(), key=lambda role: role.id)
+                for name, named in self._entry(guild).roles.items() if len(named) > 1}
+
+    def duplicate_channels(self, guild: discord.Guild) -> Dict[str, List[discord.abc.GuildChannel]]:
+        """Get every channel name shared by more than one channel, oldest channel first"""
+        return {name: sorted(named.values(), key=lambda channel: channel.id)
+                for name, named in self._entry(guild).channels.items() if len(named) > 1}
+
+    def add_role(self, role: discord.Role):
+        """Index a new role"""
+        _add(self._entry(role.guild).roles, role.name, role)
+
+    def remove_role(self, role: discord.Role):
+        """Drop a deleted role"""
+        _remove(self._entry(role.guild).roles, role.name, role.id)
+
+    def update_role(self, before: discord.Role, after: discord.Role):
+        """Re-index a role that may have been renamed"""
+        roles = self._entry(after.guild).roles
+        _remove(roles, before.name, before.id)
+        _add(roles, after.name, after)
+
+    def add_channel(self, channel: discord.abc.GuildChannel):
+        """Index a new channel"""
+        self._entry(channel.guild).add_channel(channel)
+
+    def remove_channel(self, channel: discord.abc.GuildChannel):
+        """Drop a deleted channel"""
+        self._entry(channel.guild).remove_channel(channel.name, channel.id)
+
+    def update_channel(self, before: discord.abc.GuildChannel, after: discord.abc.GuildChannel):
+        """Re-index a channel that may have been renamed or moved"""
+        entry = self._entry(after.guild)
+        entry.remove_channel(before.name, before.id)
+        entry.add_channel(after)
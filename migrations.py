@@ -0,0 +1,173 @@
+import logging
+import sqlite3
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+# Ordered schema migrations applied on top of the base tables.
+# Each entry is (version, description, statements). Versions must increase;
+# never edit a migration that has shipped, append a new one instead.
+MIGRATIONS = [
+    (1, "Index open screening session lookups by user", [
+        '''
+        CREATE INDEX IF NOT EXISTS idx_screening_sessions_user_open
+        ON screening_sessions (user_id, is_completed, created_at)
+        '''
+    ]),
+    (2, "Index users by campaign", [
+        'CREATE INDEX IF NOT EXISTS idx_users_campaign ON users (campaign)'
+    ]),
+    (3, "Normalize screening answers into user_answers", [
+        '''
+        CREATE TABLE IF NOT EXISTS user_answers (
+            user_id INTEGER NOT NULL,
+            question TEXT NOT NULL,
+            value TEXT NOT NULL,
+            PRIMARY KEY (user_id, question, value)
+        ) WITHOUT ROWID
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS idx_user_answers_question_value
+        ON user_answers (question, value, user_id)
+        ''',
+        # Backfill from the JSON blobs of users who already completed screening
+        '''
+        INSERT OR IGNORE INTO user_answers (user_id, question, value)
+        SELECT u.user_id, q.key, a.value
+        FROM users u,
+             json_each(u.screening_data) q,
+             json_each(u.screening_data, '$."' || q.key || '"') a
+        WHERE json_valid(u.screening_data) AND a.value IS NOT NULL
+        '''
+    ]),
+    (4, "Maintain user statistics counters with triggers", [
+        '''
+        CREATE TABLE IF NOT EXISTS stats_counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS campaign_user_counts (
+            campaign TEXT PRIMARY KEY,
+            user_count INTEGER NOT NULL DEFAULT 0
+        )
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_users_stats_insert AFTER INSERT ON users
+        BEGIN
+            UPDATE stats_counters SET value = value + 1 WHERE name = 'total_users';
+            UPDATE stats_counters SET value = value + 1
+            WHERE name = 'completed_screenings' AND NEW.screening_completed;
+            INSERT INTO campaign_user_counts (campaign, user_count)
+            SELECT NEW.campaign, 1 WHERE NEW.campaign IS NOT NULL
+            ON CONFLICT (campaign) DO UPDATE SET user_count = user_count + 1;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_users_stats_delete AFTER DELETE ON users
+        BEGIN
+            UPDATE stats_counters SET value = value - 1 WHERE name = 'total_users';
+            UPDATE stats_counters SET value = value - 1
+            WHERE name = 'completed_screenings' AND OLD.screening_completed;
+            UPDATE campaign_user_counts SET user_count = user_count - 1
+            WHERE campaign = OLD.campaign;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_users_stats_update
+        AFTER UPDATE OF screening_completed, campaign ON users
+        BEGIN
+            UPDATE stats_counters
+            SET value = value
+                + (CASE WHEN NEW.screening_completed THEN 1 ELSE 0 END)
+                - (CASE WHEN OLD.screening_completed THEN 1 ELSE 0 END)
+            WHERE name = 'completed_screenings';
+            UPDATE campaign_user_counts SET user_count = user_count - 1
+            WHERE campaign = OLD.campaign AND OLD.campaign IS NOT NEW.campaign;
+            INSERT INTO campaign_user_counts (campaign, user_count)
+            SELECT NEW.campaign, 1 WHERE NEW.campaign IS NOT NULL AND OLD.campaign IS NOT NEW.campaign
+            ON CONFLICT (campaign) DO UPDATE SET user_count = user_count + 1;
+        END
+        ''',
+        # Seed the counters from the existing rows
+        '''
+        INSERT OR REPLACE INTO stats_counters (name, value)
+        SELECT 'total_users', COUNT(*) FROM users
+        UNION ALL
+        SELECT 'completed_screenings', COUNT(*) FROM users WHERE screening_completed
+        ''',
+        '''
+        INSERT OR REPLACE INTO campaign_user_counts (campaign, user_count)
+        SELECT campaign, COUNT(*) FROM users WHERE campaign IS NOT NULL GROUP BY campaign
+        '''
+    ]),
+    (5, "Add screening session archive for retention", [
+        '''
+        CREATE TABLE IF NOT EXISTS screening_session_archive (
+            day TEXT NOT NULL,
+            campaign TEXT NOT NULL DEFAULT '',
+            outcome TEXT NOT NULL,  -- 'completed' or 'abandoned'
+            session_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, campaign, outcome)
+        ) WITHOUT ROWID
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS idx_screening_sessions_created_at
+        ON screening_sessions (created_at)
+        '''
+    ]),
+    # Version 6 created channel_permission_fingerprints, which is no longer
+    # used. Some databases applied it, so the number is never reused and
+    # version 8 drops the table
+    (7, "Record roles and channels created by the bot", [
+        '''
+        CREATE TABLE IF NOT EXISTS managed_objects (
+            object_id INTEGER PRIMARY KEY,
+            guild_id INTEGER NOT NULL,
+            kind TEXT NOT NULL,  -- 'role', 'channel' or 'category'
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS idx_managed_objects_guild
+        ON managed_objects (guild_id)
+        '''
+    ]),
+    (8, "Drop channel permission fingerprints", [
+        'DROP TABLE IF EXISTS channel_permission_fingerprints'
+    ]),
+]
+
+def get_schema_version(cursor: sqlite3.Cursor) -> int:
+    """Get the highest migration version applied to the database"""
+    cursor.execute('SELECT COALESCE(MAX(version), 0) FROM schema_version')
+    return cursor.fetchone()[0]
+
+def apply_migrations(cursor: sqlite3.Cursor) -> List[int]:
+    """Apply every migration newer than the recorded schema version, in order.
+    Returns the versions that were applied.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    current_version = get_schema_version(cursor)
+    applied = []
+    for version, description, statements in MIGRATIONS:
+        if version <= current_version:
+            continue
+        
+        for statement in statements:
+            cursor.execute(statement)
+        
+        cursor.execute('INSERT INTO schema_version (version, description) VALUES (?, ?)',
+                       (version, description))
+        applied.append(version)
+        logger.info(f"Applied schema migration {version}: {description}")
+    
+    return applied
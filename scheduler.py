@@ -0,0 +1,270 @@
+import asyncio
+import itertools
+import logging
+import random
+import time
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+class Priority(IntEnum):
+    """Scheduling classes; lower values run first"""
+    INTERACTIVE = 0   # screening DMs a user is waiting on
+    PROVISIONING = 1  # roles and channels for a member who just finished screening
+    AUDIT = 2         # background permission audits and pre-provisioning
+    ANNOUNCEMENT = 3  # welcome posts
+
+# route -> (tokens per second, burst size) for each bucket of the route. Like
+# Discord, a route has one bucket per major parameter (the DM recipient, the
+# guild, the channel) passed as the job's key. Kept under Discord's published
+# limits so the library's own 429 handling is the exception, not the rule.
+ROUTE_LIMITS: Dict[str, Tuple[float, int]] = {
+    'dm': (1.0, 5),
+    # Bot-wide: opening a DM channel is limited per bot, not per recipient (40003)
+    'dm_open': (1.0, 5),
+    'member_roles': (1.0, 10),
+    'role_create': (0.5, 2),
+    'role_delete': (0.5, 2),
+    'channel_create': (0.5, 2),
+    'channel_edit': (1.0, 5),
+    'channel_delete': (0.5, 2),
+    'message': (1.0, 5),
+}
+DEFAULT_ROUTE_LIMIT = (1.0, 5)
+# Shared by every route, under Discord's global limit of 50 requests per second
+GLOBAL_LIMIT = (45.0, 45)
+# Idle buckets are dropped once there are more than this many
+MAX_BUCKETS = 4096
+
+# Routes whose actions can safely run twice. Discord may have applied a request
+# that failed with a 5xx, so only these are retried after one; creates and
+# sends are retried only after rate limits, which Discord never applied.
+IDEMPOTENT_ROUTES = frozenset({'member_roles', 'channel_edit', 'role_delete', 'channel_delete'})
+
+class TokenBucket:
+    """Token bucket that hands out reservations instead of blocking"""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def reserve(self) -> float:
+        """Take a token, returning how many seconds to wait before using it"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def is_idle(self) -> bool:
+        """Check whether the bucket has refilled, so dropping it loses nothing"""
+        return self.tokens + (time.monotonic() - self.updated) * self.rate >= self.capacity
+
+class _Job:
+    __slots__ = ('route', 'key', 'shared_route', 'priority', 'action', 'future', 'attempts', 'reserved',
+                 'enqueued_at')
+
+    def __init__(self, route: str, key: Hashable, shared_route: Optional[str], priority: Priority,
+                 action: Callable[[], Awaitable[Any]], future: asyncio.Future):
+        self.route = route
+        self.key = key
+        self.shared_route = shared_route
+        self.priority = priority
+        self.action = action
+        self.future = future
+        self.attempts = 0
+        self.reserved = False
+        self.enqueued_at = time.monotonic()
+
+def _is_retryable(error: Exception, route: str) -> bool:
+    if isinstance(error, discord.RateLimited):
+        return True
+    if isinstance(error, discord.HTTPException):
+        # 40003: opening DMs too fast, reported as a plain 400
+        if error.status == 429 or error.code == 40003:
+            return True
+        # discord.py has already retried the 5xx itself
+        return error.status >= 500 and route in IDEMPOTENT_ROUTES
+    return False
+
+def _log_failure(future: asyncio.Future):
+    if not future.cancelled() and future.exception() is not None:
+        logger.error(f"Background Discord action failed: {future.exception()}")
+
+class DiscordScheduler:
+    """Single queue for outbound Discord actions.
+
+    Actions are zero-argument coroutine factories, run by a fixed pool of workers
+    in priority order. Each route has a token bucket per key, plus one global
+    bucket shared by all actions; an action that has to
+    wait for a token, or back off after a rate-limit error, is set aside rather
+    than holding up a worker, so other routes and priorities keep moving.
+    """
+
+    def __init__(self, workers: int = 4, max_retries: int = 5, base_delay: float = 1.0,
+                 max_delay: float = 60.0):
+        self.workers = workers
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._buckets: Dict[Tuple[str, Hashable], TokenBucket] = {}
+        self._global_bucket = TokenBucket(*GLOBAL_LIMIT)
+        self._sequence = itertools.count()
+        self._tasks: List[asyncio.Task] = []
+        # Jobs waiting out a bucket or retry delay, with the timers that requeue them
+        self._deferred: Dict[_Job, asyncio.TimerHandle] = {}
+        self._queued = {priority: 0 for priority in Priority}
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._retries = 0
+        self._total_latency = 0.0
+        self._max_latency = 0.0
+
+    def start(self):
+        """Start the workers on the running event loop"""
+        if self._tasks:
+            return
+        self._queue = asyncio.PriorityQueue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Stop the workers and cancel every action still queued or backing off"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for job, timer in self._deferred.items():
+            timer.cancel()
+            self._queued[job.priority] -= 1
+            job.future.cancel()
+        self._deferred.clear()
+        while self._queue and not self._queue.empty():
+            _, _, job = self._queue.get_nowait()
+            self._queued[job.priority] -= 1
+            job.future.cancel()
+
+    def submit(self, route: str, priority: Priority, action: Callable[[], Awaitable[Any]],
+               key: Hashable = None, shared_route: Optional[str] = None,
+               background: bool = False) -> asyncio.Future:
+        """Queue an action and return a future for its result. key picks the
+        route's bucket, e.g. the user id for DMs or the guild id for roles;
+        shared_route names a bot-wide bucket the action also draws from.
+        Failures of background actions are logged instead of being left on the
+        future."""
+        future = asyncio.get_running_loop().create_future()
+        if background:
+            future.add_done_callback(_log_failure)
+        self._put(_Job(route, key, shared_route, priority, action, future))
+        return future
+
+    async def run(self, route: str, priority: Priority, action: Callable[[], Awaitable[Any]],
+                  key: Hashable = None, shared_route: Optional[str] = None) -> Any:
+        """Queue an action and wait for its result"""
+        return await self.submit(route, priority, action, key, shared_route)
+
+    def queue_depth(self) -> int:
+        """Number of actions waiting to run, including ones backing off"""
+        return sum(self._queued.values())
+
+    def is_idle(self) -> bool:
+        """Check whether nothing is queued or running"""
+        return self.queue_depth() == 0 and self._in_flight == 0
+
+    def get_stats(self) -> Dict:
+        """Get queue depth per priority and action counters"""
+        finished = self._completed + self._failed
+        return {
+            'queued': self.queue_depth(),
+            'queued_by_priority': {priority.name.lower(): count for priority, count in self._queued.items()},
+            'in_flight': self._in_flight,
+            'completed': self._completed,
+            'failed': self._failed,
+            'retries': self._retries,
+            'average_latency_ms': self._total_latency / finished * 1000 if finished else 0.0,
+            'max_latency_ms': self._max_latency * 1000
+        }
+
+    def _put(self, job: _Job):
+        self._queued[job.priority] += 1
+        self._queue.put_nowait((job.priority, next(self._sequence), job))
+
+    def _bucket(self, route: str, key: Hashable) -> TokenBucket:
+        bucket = self._buckets.get((route, key))
+        if bucket is None:
+            if len(self._buckets) >= MAX_BUCKETS:
+                self._buckets = {bucket_key: bucket for bucket_key, bucket in self._buckets.items()
+                                 if not bucket.is_idle()}
+            bucket = self._buckets[(route, key)] = TokenBucket(*ROUTE_LIMITS.get(route, DEFAULT_ROUTE_LIMIT))
+        return bucket
+
+    async def _worker(self):
+        while True:
+            _, _, job = await self._queue.get()
+            self._queued[job.priority] -= 1
+            if job.future.done():
+                continue
+
+            if not job.reserved:
+                delay = max(self._bucket(job.route, job.key).reserve(), self._global_bucket.reserve())
+                if job.shared_route is not None:
+                    delay = max(delay, self._bucket(job.shared_route, None).reserve())
+                if delay > 0:
+                    job.reserved = True
+                    self._defer(job, delay)
+                    continue
+            job.reserved = False
+
+            self._in_flight += 1
+            try:
+                result = await job.action()
+            except asyncio.CancelledError:
+                job.future.cancel()
+                raise
+            except Exception as e:
+                self._handle_error(job, e)
+            else:
+                self._finish(job)
+                if not job.future.done():
+                    job.future.set_result(result)
+            finally:
+                self._in_flight -= 1
+
+    def _handle_error(self, job: _Job, error: Exception):
+        if _is_retryable(error, job.route) and job.attempts < self.max_retries:
+            retry_after = getattr(error, 'retry_after', None)
+            delay = retry_after or min(self.max_delay, self.base_delay * 2 ** job.attempts)
+            delay *= 1 + random.random() * 0.1
+            job.attempts += 1
+            self._retries += 1
+            logger.warning(f"Rate limited on {job.route}, retry {job.attempts}/{self.max_retries} in {delay:.1f}s")
+            self._defer(job, delay)
+            return
+
+        self._failed += 1
+        self._finish(job, failed=True)
+        if not job.future.done():
+            job.future.set_exception(error)
+
+    def _defer(self, job: _Job, delay: float):
+        # Counted as queued while it waits, without tying up a worker
+        self._queued[job.priority] += 1
+        self._deferred[job] = asyncio.get_running_loop().call_later(delay, self._requeue, job)
+
+    def _requeue(self, job: _Job):
+        del self._deferred[job]
+        self._queued[job.priority] -= 1
+        self._put(job)
+
+    def _finish(self, job: _Job, failed: bool = False):
+        if not failed:
+            self._completed += 1
+        latency = time.monotonic() - job.enqueued_at
+        self._total_latency += latency
+        self._max_latency = max(self._max_latency, latency)
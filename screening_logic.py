@@ -1,88 +1,182 @@
-from typing import Dict, List, Any
+import functools
+import hashlib
+import itertools
+import json
+from types import MappingProxyType
+from typing import Dict, List, Any, Mapping, NamedTuple, Optional, Tuple, FrozenSet
 import config
 
+# Questions that accept several answers
+MULTI_SELECT_QUESTIONS = frozenset({'show_types'})
+
+# Headings used in the screening summary
+SUMMARY_TITLES = {
+    'gender': 'Gender',
+    'age_group': 'Age Group',
+    'show_types': 'Content Types',
+    'city_tier': 'City Tier'
+}
+
+class Questionnaire(NamedTuple):
+    """SCREENING_QUESTIONS compiled into read-only lookup tables"""
+    version: str                                    # changes whenever the questions change
+    order: Tuple[str, ...]                          # question keys in the order they are asked
+    first: str
+    next_question: Mapping[str, Optional[str]]      # question -> following question, None after the last
+    numbers: Mapping[str, int]                      # question -> 1-based position
+    values: Mapping[str, Tuple[str, ...]]           # question -> option values, in display order
+    labels: Mapping[str, Mapping[str, str]]         # question -> option value -> label
+    ranks: Mapping[str, Mapping[str, int]]          # question -> option value -> display position
+    valid_values: Mapping[str, FrozenSet[str]]
+    multi_select: FrozenSet[str]
+
+def compile_questionnaire(questions: Dict) -> Questionnaire:
+    """Compile the screening questions (asked in definition order) into a Questionnaire"""
+    order = tuple(questions)
+    values = {key: tuple(option['value'] for option in questions[key]['options']) for key in order}
+    return Questionnaire(
+        version=hashlib.sha1(json.dumps(questions, sort_keys=True).encode()).hexdigest()[:12],
+        order=order,
+        first=order[0],
+        next_question=MappingProxyType({key: (order[i + 1] if i + 1 < len(order) else None)
+                                        for i, key in enumerate(order)}),
+        numbers=MappingProxyType({key: i + 1 for i, key in enumerate(order)}),
+        values=MappingProxyType(values),
+        labels=MappingProxyType({key: MappingProxyType({option['value']: option['label']
+                                                        for option in questions[key]['options']})
+                                 for key in order}),
+        ranks=MappingProxyType({key: MappingProxyType({value: i for i, value in enumerate(values[key])})
+                                for key in order}),
+        valid_values=MappingProxyType({key: frozenset(values[key]) for key in order}),
+        multi_select=frozenset(key for key in order if key in MULTI_SELECT_QUESTIONS)
+    )
+
+def answer_space_size(questionnaire: Questionnaire) -> int:
+    """Number of distinct complete answer sets the questionnaire accepts"""
+    size = 1
+    for key in questionnaire.order:
+        options = len(questionnaire.values[key])
+        size *= 2 ** options - 1 if key in questionnaire.multi_select else options
+    return size
+
+# Compiled once at import; every per-interaction lookup goes through it
+QUESTIONNAIRE = compile_questionnaire(config.SCREENING_QUESTIONS)
+
+AnswerKey = Tuple[Tuple[str, Tuple[str, ...]], ...]
+
+class CohortMapping(NamedTuple):
+    """Roles and channels for one answer set, in a stable order"""
+    roles: Tuple[str, ...]
+    channels: Tuple[str, ...]
+    pairs: Tuple[Tuple[str, str], ...]  # (role, channel it grants access to)
+
+def canonical_answers(screening_data: Dict, questionnaire: Questionnaire = QUESTIONNAIRE) -> AnswerKey:
+    """Encode screening answers as a frozen, order-independent key: one entry per
+    question in questionnaire order, with its values in option order"""
+    key = []
+    for question in questionnaire.order:
+        answer = screening_data.get(question)
+        values = answer if isinstance(answer, list) else ([answer] if answer else [])
+        ranks = questionnaire.ranks[question]
+        key.append((question, tuple(sorted(set(values), key=lambda value: (ranks.get(value, len(ranks)), value)))))
+    return tuple(key)
+
+@functools.lru_cache(maxsize=answer_space_size(QUESTIONNAIRE))
+def map_answers(key: AnswerKey) -> CohortMapping:
+    """Build the cohort roles and channels for a canonical answer key"""
+    answers = dict(key)
+    gender = answers.get('gender', ())[:1] or ('unknown',)
+    age_group = answers.get('age_group', ())[:1] or ('unknown',)
+    city_tier = answers.get('city_tier', ())[:1] or ('unknown',)
+    gender, age_group, city_tier = gender[0], age_group[0], city_tier[0]
+    show_types = answers.get('show_types', ())
+    
+    # Base role for all screened users
+    roles = ['Screened User']
+    channels = []
+    pairs = []
+    
+    # Hierarchy: gender -> age -> content -> tier, one role and channel of the same name per content type
+    base_prefix = f"{gender}-{age_group}"
+    suffixes = [f"-{show_type}" for show_type in show_types] or [""]
+    for suffix in suffixes:
+        name = f"{base_prefix}{suffix}-{city_tier}" if city_tier != 'unknown' else f"{base_prefix}{suffix}"
+        channels.append(name)
+        if gender != 'unknown' and age_group != 'unknown':
+            roles.append(name)
+            pairs.append((name, name))
+    
+    return CohortMapping(tuple(roles), tuple(channels), tuple(pairs))
+
 class ScreeningLogic:
     def __init__(self):
         self.questions = config.SCREENING_QUESTIONS
+        self.questionnaire = QUESTIONNAIRE
+        matrix = self.get_cohort_matrix()
+        self.cohort_names = frozenset(matrix['roles']) | frozenset(matrix['channels'])
     
     def get_next_question(self, current_question: str) -> str:
         """Get the next question in the screening flow"""
-        # NEW ORDER: gender -> age_group -> show_types -> city_tier
-        question_order = ['gender', 'age_group', 'show_types', 'city_tier']
-        
-        try:
-            current_index = question_order.index(current_question)
-            if current_index < len(question_order) - 1:
-                return question_order[current_index + 1]
-            return None  # Screening complete
-        except ValueError:
-            return 'gender'  # Start from beginning if invalid
+        # Start from the beginning if invalid; None once screening is complete
+        return self.questionnaire.next_question.get(current_question, self.questionnaire.first)
+    
+    def get_question_number(self, question_key: str) -> int:
+        """Get the 1-based position of a question, for display"""
+        return self.questionnaire.numbers.get(question_key, 1)
+    
+    def get_first_unanswered_question(self, screening_data: Dict) -> str:
+        """Get the first question without an answer, or None if all are answered"""
+        for question in self.questionnaire.order:
+            if not screening_data.get(question):
+                return question
+        return None
+    
+    def map_profile(self, screening_data: Dict) -> CohortMapping:
+        """Get the memoized roles, channels and role -> channel pairs for a set of answers"""
+        return map_answers(canonical_answers(screening_data, self.questionnaire))
     
     def determine_roles(self, screening_data: Dict) -> List[str]:
         """Determine hierarchical roles to assign based on screening data"""
-        roles = []
-        
-        gender = screening_data.get('gender', ['unknown'])[0]
-        age_group = screening_data.get('age_group', ['unknown'])[0]
-        show_types = screening_data.get('show_types', [])
-        city_tier = screening_data.get('city_tier', ['unknown'])[0]
+        return list(self.map_profile(screening_data).roles)
 
-        # Base role for all screened users
-        roles.append('Screened User')
-
-        # Create hierarchical roles
-        if gender != 'unknown' and age_group != 'unknown':
-            base_role_prefix = f"{gender}-{age_group}"
-            
-            if show_types:
-                for show_type in show_types:
-                    if city_tier != 'unknown':
-                        roles.append(f"{base_role_prefix}-{show_type}-{city_tier}")
-                    else:
-                        roles.append(f"{base_role_prefix}-{show_type}")
-            else: # If no show types selected, still create roles based on gender-age-tier
-                if city_tier != 'unknown':
-                    roles.append(f"{base_role_prefix}-{city_tier}")
-                else:
-                    roles.append(base_role_prefix) # Just gender-age if no other info
-
-        return list(set(roles))  # Remove duplicates
-
-    def determine_roles_and_channels(self, screening_data: Dict) -> Dict[str, List[str]]:
+    def determine_roles_and_channels(self, screening_data: Dict) -> Dict[str, List]:
         """
         Determine which roles and channels to create/assign based on screening data
-        Returns: {'roles': [...], 'channels': [...]}
+        Returns: {'roles': [...], 'channels': [...], 'pairs': [(role, channel), ...]}
         
         Hierarchy: gender -> age -> content -> tier
         Example: female -> female-18_24 -> female-18_24-scripted -> female-18_24-scripted-tier1
         """
-        roles = self.determine_roles(screening_data)
-        channels = []
-        
-        gender = screening_data.get('gender', ['unknown'])[0]
-        age_group = screening_data.get('age_group', ['unknown'])[0]
-        show_types = screening_data.get('show_types', [])
-        city_tier = screening_data.get('city_tier', ['unknown'])[0]
+        mapping = self.map_profile(screening_data)
+        return {
+            'roles': list(mapping.roles),
+            'channels': list(mapping.channels),
+            'pairs': list(mapping.pairs)
+        }
+    
+    def get_cohort_matrix(self) -> Dict[str, List[str]]:
+        """
+        Enumerate every role and channel a completed screening can map to
+        Returns: {'roles': [...], 'channels': [...]}
+        """
+        roles = set()
+        channels = set()
         
-        # Create hierarchical channels for each content type selected
-        if show_types:
-            for content_type in show_types:
-                if city_tier != 'unknown':
-                    channel_name = f"{gender}-{age_group}-{content_type}-{city_tier}"
-                else:
-                    channel_name = f"{gender}-{age_group}-{content_type}"
-                channels.append(channel_name)
-        else:
-            # If no show types, create general channel
-            if city_tier != 'unknown':
-                channel_name = f"{gender}-{age_group}-{city_tier}"
-            else:
-                channel_name = f"{gender}-{age_group}"
-            channels.append(channel_name)
+        values = self.questionnaire.values
+        for gender, age_group, show_type, city_tier in itertools.product(
+                values['gender'], values['age_group'], values['show_types'], values['city_tier']):
+            role_channel_data = self.determine_roles_and_channels({
+                'gender': [gender],
+                'age_group': [age_group],
+                'show_types': [show_type],
+                'city_tier': [city_tier]
+            })
+            roles.update(role_channel_data['roles'])
+            channels.update(role_channel_data['channels'])
         
         return {
-            'roles': roles,
-            'channels': channels
+            'roles': sorted(roles),
+            'channels': sorted(channels)
         }
     
     def get_user_segments(self, screening_data: Dict) -> Dict[str, Any]:
@@ -102,11 +196,12 @@ class ScreeningLogic:
         return segments
     
     def validate_screening_data(self, screening_data: Dict) -> bool:
-        """Validate that all required questions are answered"""
-        required_questions = ['gender', 'age_group', 'show_types', 'city_tier']
-        
-        for question in required_questions:
-            if question not in screening_data or not screening_data[question]:
+        """Validate that every question is answered with known options"""
+        for question in self.questionnaire.order:
+            answer = screening_data.get(question)
+            if not answer:
+                return False
+            if not self.questionnaire.valid_values[question].issuperset(answer if isinstance(answer, list) else [answer]):
                 return False
         
         return True
@@ -115,45 +210,19 @@ class ScreeningLogic:
         """Generate a summary of the user's screening responses"""
         summary_parts = []
         
-        # Gender
-        gender = screening_data.get('gender')
-        if gender:
-            if isinstance(gender, list):
-                gender = gender[0]
-            gender_info = next((opt for opt in self.questions['gender']['options'] 
-                              if opt['value'] == gender), None)
-            if gender_info:
-                summary_parts.append(f"**Gender:** {gender_info['label']}")
-        
-        # Age group
-        age_group = screening_data.get('age_group')
-        if age_group:
-            if isinstance(age_group, list):
-                age_group = age_group[0]
-            age_info = next((opt for opt in self.questions['age_group']['options'] 
-                           if opt['value'] == age_group), None)
-            if age_info:
-                summary_parts.append(f"**Age Group:** {age_info['label']}")
-        
-        # Show types
-        show_types = screening_data.get('show_types', [])
-        if show_types:
-            type_labels = []
-            for show_type in show_types:
-                type_info = next((opt for opt in self.questions['show_types']['options'] 
-                                if opt['value'] == show_type), None)
-                if type_info:
-                    type_labels.append(type_info['label'])
-            summary_parts.append(f"**Content Types:** {', '.join(type_labels)}")
-        
-        # City tier
-        tier = screening_data.get('city_tier')
-        if tier:
-            if isinstance(tier, list):
-                tier = tier[0]
-            tier_info = next((opt for opt in self.questions['city_tier']['options'] 
-                            if opt['value'] == tier), None)
-            if tier_info:
-                summary_parts.append(f"**City Tier:** {tier_info['label']}")
+        for question in self.questionnaire.order:
+            answer = screening_data.get(question)
+            if not answer:
+                continue
+            labels = self.questionnaire.labels[question]
+            title = SUMMARY_TITLES.get(question, question.replace('_', ' ').title())
+            
+            if question in self.questionnaire.multi_select:
+                values = answer if isinstance(answer, list) else [answer]
+                summary_parts.append(f"**{title}:** {', '.join(labels[value] for value in values if value in labels)}")
+            else:
+                value = answer[0] if isinstance(answer, list) else answer
+                if value in labels:
+                    summary_parts.append(f"**{title}:** {labels[value]}")
         
         return '\n'.join(summary_parts)
@@ -0,0 +1,27 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one in-flight call.
+
+    The first caller for a key starts the call; callers arriving while it runs
+    await the same result (or exception) instead of starting their own. Once it
+    finishes the key is free again. Waiters are shielded from each other, so one
+    cancelled caller does not cancel the shared call.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Run func for key, or join the call already in flight for it"""
+        future = self._calls.get(key)
+        if future is None:
+            future = asyncio.ensure_future(func())
+            self._calls[key] = future
+            future.add_done_callback(lambda _: self._calls.pop(key, None))
+        return await asyncio.shield(future)
+
+    def in_flight(self) -> int:
+        """Number of keys with a call currently running"""
+        return len(self._calls)
@@ -0,0 +1,453 @@
+import copy
+import itertools
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Any, ContextManager, Iterable, Iterator, Protocol, Set, Tuple
+
+class StorageBackend(Protocol):
+    """Synchronous storage interface the bot's data layer is written against.
+    
+    DatabaseManager (SQLite) and InMemoryStorage implement it. AsyncDatabaseManager
+    runs a backend's methods off the event loop, so a new backend only has to
+    provide these methods with the same return conventions: failures are
+    reported as False / None / empty results rather than raised.
+    """
+    
+    def batch(self) -> ContextManager[None]:
+        """Group the writes made inside the block. How strong the grouping is depends
+        on the backend: a persistent SQLite connection commits the block as one
+        transaction and rolls it back if the block raises, while InMemoryStorage
+        only keeps other threads out and cannot undo writes made before a failure."""
+        ...
+    
+    def init_database(self) -> None: ...
+    
+    def close(self) -> None: ...
+    
+    def add_user(self, user_id: int, username: str, display_name: str,
+                 campaign: str = None, invite_link: str = None) -> bool: ...
+    
+    def get_user(self, user_id: int) -> Optional[Dict]: ...
+    
+    def remove_user(self, user_id: int) -> bool: ...
+    
+    def update_user_screening(self, user_id: int, screening_data: Dict,
+                              roles_assigned: List[str]) -> bool: ...
+    
+    def start_screening_session(self, user_id: int, campaign: str) -> int: ...
+    
+    def update_screening_session(self, user_id: int, question: str, answer: Any) -> bool: ...
+    
+    def get_open_screening_session(self, user_id: int) -> Optional[Dict]: ...
+    
+    def complete_screening_session(self, user_id: int, answers: Optional[Dict] = None) -> Optional[Dict]: ...
+    
+    def add_campaign(self, name: str, description: str, invite_link: str) -> bool: ...
+    
+    def get_campaigns(self) -> List[Dict]: ...
+    
+    def get_user_stats(self) -> Dict: ...
+    
+    def reconcile_stats(self) -> Dict: ...
+    
+    def archive_screening_sessions(self, max_age_days: float, batch_size: int = 500) -> int: ...
+    
+    def reclaim_free_pages(self, max_pages: int = 1000) -> int: ...
+    
+    def add_managed_object(self, guild_id: int, object_id: int, kind: str) -> bool: ...
+    
+    def get_managed_objects(self, guild_id: int) -> Set[int]: ...
+    
+    def iter_users(self, batch_size: int = 500) -> Iterator[Dict]: ...
+    
+    def iter_screening_sessions(self, batch_size: int = 500) -> Iterator[Dict]: ...
+    
+    def import_users(self, users: Iterable[Dict], batch_size: int = 5000) -> int: ...
+    
+    def import_screening_sessions(self, sessions: Iterable[Dict], batch_size: int = 5000) -> int: ...
+    
+    def count_cohort(self, filters: Dict[str, str]) -> int: ...
+    
+    def get_segment_counts(self, group_by: List[str],
+                           filters: Optional[Dict[str, str]] = None) -> Dict[Tuple[str, ...], int]: ...
+
+
+def _now() -> str:
+    """Timestamp in the same format SQLite's CURRENT_TIMESTAMP produces"""
+    return datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+
+def _answer_values(values: Any) -> List[str]:
+    """Normalise a stored answer (list or scalar) to its string values"""
+    return [str(value) for value in (values if isinstance(values, list) else [values]) if value is not None]
+
+
+class InMemoryStorage:
+    """StorageBackend kept entirely in process memory, with the same semantics as
+    DatabaseManager. Useful for benchmarking the screening flow without disk I/O
+    and for ephemeral load tests; everything is lost when the process exits.
+    """
+    
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._users: Dict[int, Dict] = {}
+        self._sessions: Dict[int, Dict] = {}
+        self._session_ids = itertools.count(1)
+        # user_id -> ids of that user's sessions, and of the ones still open (oldest first)
+        self._sessions_by_user: Dict[int, List[int]] = {}
+        self._open_sessions: Dict[int, List[int]] = {}
+        self._campaigns: Dict[str, Dict] = {}
+        self._campaign_ids = itertools.count(1)
+        # (question, value) -> user_ids, and user_id -> its (question, value) pairs
+        self._answer_index: Dict[Tuple[str, str], Set[int]] = {}
+        self._user_answers: Dict[int, Set[Tuple[str, str]]] = {}
+        self._total_users = 0
+        self._completed_screenings = 0
+        self._campaign_counts: Dict[str, int] = {}
+        # (day, campaign, outcome) -> archived session count
+        self._session_archive: Dict[Tuple[str, str, str], int] = {}
+        # guild_id -> ids of the roles, channels and categories the bot created
+        self._managed_objects: Dict[int, Set[int]] = {}
+    
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Hold the storage lock so no other thread sees the block half-applied.
+        Nothing is rolled back: writes made before a failure stay applied."""
+        with self._lock:
+            yield
+    
+    def init_database(self):
+        """Nothing to create for in-memory storage"""
+    
+    def close(self):
+        """Nothing to release for in-memory storage"""
+    
+    # Index maintenance
+    
+    def _count_user(self, user: Dict, delta: int):
+        self._total_users += delta
+        if user['screening_completed']:
+            self._completed_screenings += delta
+        if user['campaign'] is not None:
+            self._campaign_counts[user['campaign']] = self._campaign_counts.get(user['campaign'], 0) + delta
+    
+    def _set_user_answers(self, user_id: int, screening_data: Optional[Dict]):
+        for key in self._user_answers.pop(user_id, set()):
+            self._answer_index[key].discard(user_id)
+        if not screening_data:
+            return
+        keys = {(question, value) for question, values in screening_data.items()
+                for value in _answer_values(values)}
+        self._user_answers[user_id] = keys
+        for key in keys:
+            self._answer_index.setdefault(key, set()).add(user_id)
+    
+    def _store_user(self, user: Dict):
+        previous = self._users.get(user['user_id'])
+        if previous is not None:
+            self._count_user(previous, -1)
+        self._users[user['user_id']] = user
+        self._count_user(user, 1)
+        self._set_user_answers(user['user_id'], user['screening_data'])
+    
+    def _insert_session(self, session: Dict) -> int:
+        session_id = next(self._session_ids)
+        session['id'] = session_id
+        self._sessions[session_id] = session
+        self._sessions_by_user.setdefault(session['user_id'], []).append(session_id)
+        if not session['is_completed']:
+            self._open_sessions.setdefault(session['user_id'], []).append(session_id)
+        return session_id
+    
+    def _cohort(self, filters: Dict[str, str]) -> Set[int]:
+        """user_ids matching every question=value filter"""
+        matches = [self._answer_index.get((question, str(value)), set())
+                   for question, value in filters.items()]
+        return set.intersection(*matches) if matches else set(self._user_answers)
+    
+    # Users
+    
+    def add_user(self, user_id: int, username: str, display_name: str,
+                 campaign: str = None, invite_link: str = None) -> bool:
+        """Add a new user, resetting any existing record"""
+        with self._lock:
+            now = _now()
+            self._store_user({
+                'user_id': user_id,
+                'username': username,
+                'display_name': display_name,
+                'phone_number': None,
+                'campaign': campaign,
+                'invite_link': invite_link,
+                'screening_completed': 0,
+                'screening_data': None,
+                'roles_assigned': None,
+                'created_at': now,
+                'updated_at': now
+            })
+            return True
+    
+    def get_user(self, user_id: int) -> Optional[Dict]:
+        """Get user information"""
+        with self._lock:
+            return copy.deepcopy(self._users.get(user_id))
+    
+    def remove_user(self, user_id: int) -> bool:
+        """Remove user and all their data"""
+        with self._lock:
+            user = self._users.pop(user_id, None)
+            if user is not None:
+                self._count_user(user, -1)
+            self._set_user_answers(user_id, None)
+            for session_id in self._sessions_by_user.pop(user_id, []):
+                del self._sessions[session_id]
+            self._open_sessions.pop(user_id, None)
+            return True
+    
+    def update_user_screening(self, user_id: int, screening_data: Dict,
+                              roles_assigned: List[str]) -> bool:
+        """Update user's screening data and roles"""
+        with self._lock:
+            user = self._users.get(user_id)
+            if user is None:
+                return True  # Matches an UPDATE that touches no rows
+            self._store_user(dict(user,
+                                  screening_data=copy.deepcopy(screening_data),
+                                  roles_assigned=list(roles_assigned),
+                                  screening_completed=1,
+                                  updated_at=_now()))
+            return True
+    
+    # Screening sessions
+    
+    def start_screening_session(self, user_id: int, campaign: str) -> int:
+        """Start a new screening session"""
+        with self._lock:
+            return self._insert_session({
+                'user_id': user_id,
+                'campaign': campaign,
+                'current_question': 'show_types',
+                'answers': {},
+                'is_completed': 0,
+                'created_at': _now()
+            })
+    
+    def update_screening_session(self, user_id: int, question: str, answer: Any) -> bool:
+        """Record one answer in the user's latest open session"""
+        with self._lock:
+            open_sessions = self._open_sessions.get(user_id)
+            if not open_sessions:
+                return False
+            session = self._sessions[open_sessions[-1]]
+            session['answers'][question] = copy.deepcopy(answer)
+            session['current_question'] = question
+            return True
+    
+    def get_open_screening_session(self, user_id: int) -> Optional[Dict]:
+        """Get the user's latest unfinished session, unless the user is already screened"""
+        with self._lock:
+            open_sessions = self._open_sessions.get(user_id)
+            user = self._users.get(user_id)
+            if not open_sessions or (user and user['screening_completed']):
+                return None
+            session = self._sessions[open_sessions[-1]]
+            return {
+                'session_id': session['id'],
+                'campaign': session['campaign'],
+                'current_question': session['current_question'],
+                'answers': copy.deepcopy(session['answers'])
+            }
+    
+    def complete_screening_session(self, user_id: int, answers: Optional[Dict] = None) -> Optional[Dict]:
+        """Complete the user's open sessions and return the latest one's answers,
+        replacing them first if answers are given"""
+        with self._lock:
+            open_sessions = self._open_sessions.pop(user_id, None)
+            if not open_sessions:
+                return None
+            if answers is not None:
+                self._sessions[open_sessions[-1]]['answers'] = copy.deepcopy(answers)
+            for session_id in open_sessions:
+                self._sessions[session_id]['is_completed'] = 1
+            return copy.deepcopy(self._sessions[open_sessions[-1]]['answers'])
+    
+    def archive_screening_sessions(self, max_age_days: float, batch_size: int = 500) -> int:
+        """Move one batch of sessions older than max_age_days into the daily summary"""
+        cutoff = (datetime.utcnow() - timedelta(days=max_age_days)).strftime('%Y-%m-%d %H:%M:%S')
+        with self._lock:
+            expired = sorted((session for session in self._sessions.values() if session['created_at'] < cutoff),
+                             key=lambda session: (session['created_at'], session['id']))[:batch_size]
+            for session in expired:
+                key = (session['created_at'][:10], session['campaign'] or '',
+                       'completed' if session['is_completed'] else 'abandoned')
+                self._session_archive[key] = self._session_archive.get(key, 0) + 1
+                
+                del self._sessions[session['id']]
+                self._sessions_by_user[session['user_id']].remove(session['id'])
+                if not self._sessions_by_user[session['user_id']]:
+                    del self._sessions_by_user[session['user_id']]
+                open_sessions = self._open_sessions.get(session['user_id'])
+                if open_sessions and session['id'] in open_sessions:
+                    open_sessions.remove(session['id'])
+                    if not open_sessions:
+                        del self._open_sessions[session['user_id']]
+            return len(expired)
+    
+    def reclaim_free_pages(self, max_pages: int = 1000) -> int:
+        """Nothing to reclaim: deleted records are freed immediately"""
+        return 0
+    
+    # Bot-created roles and channels
+    
+    def add_managed_object(self, guild_id: int, object_id: int, kind: str) -> bool:
+        """Record a role, channel or category the bot created"""
+        with self._lock:
+            self._managed_objects.setdefault(guild_id, set()).add(object_id)
+            return True
+    
+    def get_managed_objects(self, guild_id: int) -> Set[int]:
+        """Get the ids of every role, channel and category the bot created in a guild"""
+        with self._lock:
+            return set(self._managed_objects.get(guild_id, ()))
+    
+    # Campaigns
+    
+    def add_campaign(self, name: str, description: str, invite_link: str) -> bool:
+        """Add a new campaign, replacing one with the same name"""
+        with self._lock:
+            self._campaigns[name] = {
+                'id': next(self._campaign_ids),
+                'name': name,
+                'description': description,
+                'invite_link': invite_link,
+                'is_active': 1,
+                'created_at': _now()
+            }
+            return True
+    
+    def get_campaigns(self) -> List[Dict]:
+        """Get all active campaigns"""
+        with self._lock:
+            return [dict(campaign) for campaign in sorted(self._campaigns.values(), key=lambda c: c['id'])
+                    if campaign['is_active']]
+    
+    # Statistics
+    
+    def get_user_stats(self) -> Dict:
+        """Get user statistics"""
+        with self._lock:
+            return {
+                'total_users': self._total_users,
+                'completed_screenings': self._completed_screenings,
+                'campaign_stats': {campaign: count for campaign, count in self._campaign_counts.items() if count > 0}
+            }
+    
+    def reconcile_stats(self) -> Dict:
+        """Recompute the statistics counters from the user records and return any drift"""
+        with self._lock:
+            total_users = len(self._users)
+            completed_screenings = sum(1 for user in self._users.values() if user['screening_completed'])
+            actual_campaigns: Dict[str, int] = {}
+            for user in self._users.values():
+                if user['campaign'] is not None:
+                    actual_campaigns[user['campaign']] = actual_campaigns.get(user['campaign'], 0) + 1
+            
+            drift = {}
+            if self._total_users != total_users:
+                drift['total_users'] = total_users - self._total_users
+            if self._completed_screenings != completed_screenings:
+                drift['completed_screenings'] = completed_screenings - self._completed_screenings
+            campaign_drift = {}
+            for campaign in set(self._campaign_counts) | set(actual_campaigns):
+                delta = actual_campaigns.get(campaign, 0) - self._campaign_counts.get(campaign, 0)
+                if delta:
+                    campaign_drift[campaign] = delta
+            if campaign_drift:
+                drift['campaign_stats'] = campaign_drift
+            
+            self._total_users = total_users
+            self._completed_screenings = completed_screenings
+            self._campaign_counts = actual_campaigns
+            return drift
+    
+    # Bulk export / import
+    
+    def iter_users(self, batch_size: int = 500) -> Iterator[Dict]:
+        """Stream every user in user_id order, batch_size records at a time"""
+        with self._lock:
+            user_ids = sorted(self._users)
+        for start in range(0, len(user_ids), batch_size):
+            with self._lock:
+                batch = [copy.deepcopy(self._users[user_id])
+                         for user_id in user_ids[start:start + batch_size] if user_id in self._users]
+            yield from batch
+    
+    def iter_screening_sessions(self, batch_size: int = 500) -> Iterator[Dict]:
+        """Stream every screening session in id order, batch_size records at a time"""
+        with self._lock:
+            session_ids = sorted(self._sessions)
+        for start in range(0, len(session_ids), batch_size):
+            with self._lock:
+                batch = [copy.deepcopy(self._sessions[session_id])
+                         for session_id in session_ids[start:start + batch_size] if session_id in self._sessions]
+            yield from batch
+    
+    def import_users(self, users: Iterable[Dict], batch_size: int = 5000) -> int:
+        """Bulk insert or overwrite users. Returns the number imported."""
+        imported = 0
+        with self._lock:
+            for user in users:
+                now = _now()
+                self._store_user({
+                    'user_id': user['user_id'],
+                    'username': user.get('username'),
+                    'display_name': user.get('display_name'),
+                    'phone_number': user.get('phone_number'),
+                    'campaign': user.get('campaign'),
+                    'invite_link': user.get('invite_link'),
+                    'screening_completed': int(bool(user.get('screening_completed'))),
+                    'screening_data': copy.deepcopy(user.get('screening_data')) or None,
+                    'roles_assigned': list(user['roles_assigned']) if user.get('roles_assigned') else None,
+                    'created_at': user.get('created_at') or now,
+                    'updated_at': user.get('updated_at') or now
+                })
+                imported += 1
+        return imported
+    
+    def import_screening_sessions(self, sessions: Iterable[Dict], batch_size: int = 5000) -> int:
+        """Bulk insert screening sessions with fresh ids. Returns the number imported."""
+        imported = 0
+        with self._lock:
+            for session in sessions:
+                self._insert_session({
+                    'user_id': session['user_id'],
+                    'campaign': session.get('campaign'),
+                    'current_question': session.get('current_question'),
+                    'answers': copy.deepcopy(session.get('answers') or {}),
+                    'is_completed': int(bool(session.get('is_completed'))),
+                    'created_at': session.get('created_at') or _now()
+                })
+                imported += 1
+        return imported
+    
+    # Segments
+    
+    def count_cohort(self, filters: Dict[str, str]) -> int:
+        """Count screened users matching every answer filter"""
+        with self._lock:
+            return len(self._cohort(filters or {}))
+    
+    def get_segment_counts(self, group_by: List[str],
+                           filters: Optional[Dict[str, str]] = None) -> Dict[Tuple[str, ...], int]:
+        """Count screened users per combination of answers to the group_by questions"""
+        if not group_by:
+            return {}
+        with self._lock:
+            counts: Dict[Tuple[str, ...], int] = {}
+            for user_id in self._cohort(filters or {}):
+                answers = self._user_answers.get(user_id, set())
+                per_question = [sorted(value for question, value in answers if question == wanted)
+                                for wanted in group_by]
+                for combination in itertools.product(*per_question):
+                    counts[combination] = counts.get(combination, 0) + 1
+            return counts
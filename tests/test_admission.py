@@ -0,0 +1,105 @@
+import asyncio
+from types import SimpleNamespace
+
+from admission import AdmissionQueue
+
+class Recorder:
+    """Join/leave handlers that log calls, optionally holding each one until released"""
+
+    def __init__(self):
+        self.calls = []
+        self.running = set()
+        self.release = None
+
+    async def handle(self, kind, member):
+        assert member.id not in self.running, "events for one user ran concurrently"
+        self.running.add(member.id)
+        self.calls.append((kind, member.id))
+        try:
+            if self.release is not None:
+                await self.release.wait()
+        finally:
+            self.running.discard(member.id)
+
+    async def on_join(self, member):
+        await self.handle('join', member)
+
+    async def on_leave(self, member):
+        await self.handle('leave', member)
+
+async def drain(queue, processed):
+    while queue.processed < processed:
+        await asyncio.sleep(0)
+
+def member(user_id):
+    return SimpleNamespace(id=user_id)
+
+def test_join_leave_join_collapses_into_one_onboarding():
+    async def run():
+        recorder = Recorder()
+        queue = AdmissionQueue(recorder.on_join, recorder.on_leave, workers=2)
+        queue.start()
+        try:
+            assert queue.submit_join(member(1))
+            assert queue.submit_leave(member(1))
+            assert queue.submit_join(member(1))
+            assert queue.queue_length() == 1
+            await drain(queue, 1)
+            await asyncio.sleep(0)
+            assert recorder.calls == [('join', 1)]
+            assert queue.get_stats()['coalesced'] == 2
+        finally:
+            await queue.stop()
+
+    asyncio.run(run())
+
+def test_event_for_a_running_user_waits_and_runs_after():
+    async def run():
+        recorder = Recorder()
+        recorder.release = asyncio.Event()
+        queue = AdmissionQueue(recorder.on_join, recorder.on_leave, workers=2)
+        queue.start()
+        try:
+            queue.submit_join(member(1))
+            await asyncio.sleep(0)
+            assert recorder.calls == [('join', 1)]
+
+            # The idle worker must not pick it up while the join is running
+            queue.submit_leave(member(1))
+            for _ in range(5):
+                await asyncio.sleep(0)
+            assert recorder.calls == [('join', 1)]
+            assert queue.get_stats()['running'] == 1
+
+            recorder.release.set()
+            await drain(queue, 2)
+            assert recorder.calls == [('join', 1), ('leave', 1)]
+            assert queue.queue_length() == 0
+        finally:
+            await queue.stop()
+
+    asyncio.run(run())
+
+def test_new_users_are_dropped_at_maxsize():
+    async def run():
+        recorder = Recorder()
+        queue = AdmissionQueue(recorder.on_join, recorder.on_leave, workers=1, maxsize=2)
+        queue.start()
+        try:
+            assert queue.submit_join(member(1))
+            assert queue.submit_join(member(2))
+            assert not queue.submit_join(member(3))
+            # A user already waiting still coalesces when the queue is full
+            assert queue.submit_leave(member(2))
+            assert queue.get_stats()['dropped'] == 1
+
+            await drain(queue, 2)
+            assert recorder.calls == [('join', 1), ('leave', 2)]
+            # Room again once the backlog is handled
+            assert queue.submit_join(member(3))
+            await drain(queue, 3)
+            assert recorder.calls[-1] == ('join', 3)
+        finally:
+            await queue.stop()
+
+    asyncio.run(run())
@@ -0,0 +1,35 @@
+import asyncio
+import sqlite3
+from contextlib import contextmanager
+
+from async_database import AsyncDatabaseManager
+
+def test_failed_commit_resolves_writes_with_failure_values(tmp_path):
+    async def run():
+        db = AsyncDatabaseManager(str(tmp_path / 'bot.db'), commit_interval_ms=50)
+        try:
+            writer_batch = db._writer_db.batch
+
+            @contextmanager
+            def failing_batch():
+                with writer_batch():
+                    yield
+                    raise sqlite3.OperationalError("disk I/O error")
+
+            db._writer_db.batch = failing_batch
+            results = await asyncio.gather(
+                db.add_user(1, 'user', 'User'),
+                db.start_screening_session(1, 'campaign'),
+                db.reconcile_stats()
+            )
+            assert results == [False, None, {}]
+
+            db._writer_db.batch = writer_batch
+            # The failed batch was rolled back and later writes still go through
+            assert await db.get_user(1) is None
+            assert await db.add_user(1, 'user', 'User') is True
+            assert (await db.get_user(1))['username'] == 'user'
+        finally:
+            await db.close()
+
+    asyncio.run(run())
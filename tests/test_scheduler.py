@@ -0,0 +1,81 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import discord
+import pytest
+
+import scheduler
+from scheduler import DiscordScheduler, Priority
+
+def server_error() -> discord.DiscordServerError:
+    return discord.DiscordServerError(SimpleNamespace(status=503, reason='Service Unavailable'), 'unavailable')
+
+def test_scheduler_orders_paces_retries_and_cancels(monkeypatch):
+    # One token, refilled every 50ms, so pacing shows up without slowing the test
+    monkeypatch.setitem(scheduler.ROUTE_LIMITS, 'paced', (20.0, 1))
+
+    async def run():
+        jobs = DiscordScheduler(workers=1, base_delay=0.01)
+        jobs.start()
+        try:
+            # Priority: with the only worker busy, queued actions run highest priority first
+            release = asyncio.Event()
+            order = []
+
+            async def record(name):
+                order.append(name)
+
+            blocker = jobs.submit('message', Priority.ANNOUNCEMENT, release.wait, key='blocker')
+            await asyncio.sleep(0)
+            queued = [jobs.submit('message', priority, lambda name=priority.name: record(name), key=priority)
+                      for priority in (Priority.ANNOUNCEMENT, Priority.AUDIT, Priority.INTERACTIVE)]
+            release.set()
+            await asyncio.gather(blocker, *queued)
+            assert order == ['INTERACTIVE', 'AUDIT', 'ANNOUNCEMENT']
+
+            # Token buckets: the second action on a key waits for a token, counted as queued
+            ran_at = []
+
+            async def stamp():
+                ran_at.append(time.monotonic())
+
+            paced = [jobs.submit('paced', Priority.INTERACTIVE, stamp, key=1) for _ in range(2)]
+            await asyncio.sleep(0.01)
+            assert len(ran_at) == 1
+            assert jobs.queue_depth() == 1
+            await asyncio.gather(*paced)
+            assert ran_at[1] - ran_at[0] >= 0.04
+
+            # 5xx: retried on idempotent routes only, since Discord may have applied the request
+            attempts = {'channel_edit': 0, 'role_create': 0}
+
+            async def flaky(route):
+                attempts[route] += 1
+                if attempts[route] < 3:
+                    raise server_error()
+                return route
+
+            assert await jobs.run('channel_edit', Priority.PROVISIONING, lambda: flaky('channel_edit'), key=1) == 'channel_edit'
+            assert attempts['channel_edit'] == 3
+            with pytest.raises(discord.DiscordServerError):
+                await jobs.run('role_create', Priority.PROVISIONING, lambda: flaky('role_create'), key=1)
+            assert attempts['role_create'] == 1
+        finally:
+            await jobs.stop()
+
+        # stop(): running, queued and backing-off actions are all cancelled
+        jobs = DiscordScheduler(workers=2)
+        jobs.start()
+        jobs._bucket('paced', 1).reserve()
+        backing_off = jobs.submit('paced', Priority.INTERACTIVE, asyncio.Event().wait, key=1)
+        running = [jobs.submit('message', Priority.INTERACTIVE, asyncio.Event().wait, key=key) for key in (1, 2)]
+        await asyncio.sleep(0)
+        queued = jobs.submit('message', Priority.AUDIT, asyncio.Event().wait, key=3)
+        await asyncio.sleep(0)
+        assert jobs.queue_depth() == 2
+        await jobs.stop()
+        assert all(future.cancelled() for future in (backing_off, *running, queued))
+        assert jobs.queue_depth() == 0
+
+    asyncio.run(run())
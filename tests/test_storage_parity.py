@@ -0,0 +1,71 @@
+from database import DatabaseManager
+from storage import InMemoryStorage
+
+MAYA_ANSWERS = {'show_types': ['anime', 'kdrama'], 'gender': 'female', 'age_group': '18_24', 'content_tier': 'tier2'}
+SAM_ANSWERS = {'show_types': ['anime'], 'gender': 'male', 'age_group': '25_34', 'content_tier': 'tier1'}
+
+def run_scenario(storage):
+    """Drive a backend through the bot's screening lifecycle, recording every result"""
+    results = []
+    results.append(storage.add_user(1, 'maya', 'Maya', campaign='spring'))
+    results.append(storage.add_user(2, 'sam', 'Sam', campaign='spring'))
+    results.append(storage.add_user(3, 'lee', 'Lee', campaign='autumn'))
+    results.append(storage.start_screening_session(1, 'spring'))
+    results.append(storage.start_screening_session(2, 'spring'))
+    results.append(storage.start_screening_session(3, 'autumn'))
+
+    for question, answer in MAYA_ANSWERS.items():
+        results.append(storage.update_screening_session(1, question, answer))
+    results.append(storage.update_screening_session(2, 'gender', 'female'))
+    # No open session to update
+    results.append(storage.update_screening_session(99, 'gender', 'male'))
+    results.append(storage.get_open_screening_session(1))
+    results.append(storage.get_open_screening_session(2))
+
+    results.append(storage.complete_screening_session(1))
+    # Answers given at completion replace the stored ones
+    results.append(storage.complete_screening_session(2, SAM_ANSWERS))
+    results.append(storage.complete_screening_session(1))
+    results.append(storage.update_user_screening(1, MAYA_ANSWERS, ['female', 'anime']))
+    results.append(storage.update_user_screening(2, SAM_ANSWERS, ['male', 'anime']))
+    # Unknown users store nothing
+    results.append(storage.update_user_screening(99, SAM_ANSWERS, []))
+    results.append(storage.get_open_screening_session(1))
+    results.append(storage.get_open_screening_session(3))
+
+    results.append(storage.get_user_stats())
+    results.append(storage.reconcile_stats())
+    results.append(storage.count_cohort({}))
+    results.append(storage.count_cohort({'show_types': 'anime'}))
+    results.append(storage.count_cohort({'gender': 'female', 'show_types': 'kdrama'}))
+    results.append(storage.count_cohort({'gender': 'non_binary'}))
+    results.append(storage.get_segment_counts(['gender', 'show_types']))
+    results.append(storage.get_segment_counts(['content_tier'], {'show_types': 'anime'}))
+
+    results.append(storage.remove_user(3))
+    results.append(storage.remove_user(3))
+    results.append(storage.get_user_stats())
+
+    results.append(storage.import_screening_sessions([
+        {'user_id': 4, 'campaign': 'spring', 'is_completed': True, 'created_at': '2020-01-01 00:00:00'},
+        {'user_id': 5, 'campaign': None, 'created_at': '2020-01-02 00:00:00'},
+        {'user_id': 6, 'campaign': 'spring', 'created_at': '2020-01-03 00:00:00'}
+    ]))
+    results.append(storage.archive_screening_sessions(30, batch_size=2))
+    results.append(storage.archive_screening_sessions(30, batch_size=2))
+    results.append(storage.archive_screening_sessions(30, batch_size=2))
+    results.append([{key: session[key] for key in ('user_id', 'campaign', 'answers', 'is_completed')}
+                    for session in storage.iter_screening_sessions()])
+    return results
+
+def test_sqlite_and_in_memory_backends_agree(tmp_path):
+    db = DatabaseManager(str(tmp_path / 'bot.db'))
+    try:
+        sqlite_results = run_scenario(db)
+    finally:
+        db.close()
+    memory_results = run_scenario(InMemoryStorage())
+
+    assert len(sqlite_results) == len(memory_results)
+    for step, (sqlite_result, memory_result) in enumerate(zip(sqlite_results, memory_results)):
+        assert sqlite_result == memory_result, f"step {step}"